@@ -0,0 +1,109 @@
+"""Adaptive questionnaire: ask the most informative question next, stop once settled.
+
+Questions that may still be asked are filled in from a background set of
+plausible answer vectors (the cached training data when ``dataset.py`` has
+been run, uniform random answers otherwise). Every other feature is pinned
+to the value that will actually be submitted: the patient's answers and
+age, and 0 ("not tested") for questions that will not be shown, such as the
+lab questions on the clinical-only path. All of those completions are
+scored in one ``predict_proba_matrix`` call. From that single pass:
+
+* the prediction is *settled* once every completion, and the all-remaining-
+  "none" completion that "Get Results Now" would submit, agree on the top
+  class, so no plausible set of remaining answers would change it;
+* each remaining question's expected information gain is the drop in the
+  entropy of the averaged class distribution when the completions are
+  grouped by their answer to it.
+
+Usage:
+    planner = AdaptivePlanner(model, scaler, background_rows())
+    status = planner.status(answers, age, candidates=clinical_features)
+    if not status['settled']:
+        ask(status['next_feature'])
+"""
+
+import os
+
+import numpy as np
+
+import metrics
+from features import feature_order, feature_vector, option_counts, random_answers
+from inference import predict_proba_matrix
+
+_max_options = max(option_counts.values())
+
+
+def background_rows(n=512, seed=0, data_dir=None):
+    """Plausible answer vectors: the cached training rows if present, else random answers."""
+    from dataset import DATA_DIR, FEATURES_FILE, load_arrays
+
+    data_dir = data_dir or DATA_DIR
+    if os.path.exists(os.path.join(data_dir, FEATURES_FILE)):
+        X, _ = load_arrays(data_dir)
+        return np.asarray(X, dtype=np.float64)
+    return random_answers(n, seed)
+
+
+def _entropy(p):
+    p = np.clip(p, 1e-12, 1.0)
+    return -(p * np.log2(p)).sum(axis=-1)
+
+
+class AdaptivePlanner:
+    """Question ordering and stopping for one model and background set."""
+
+    def __init__(self, model, scaler, background, temperature=1.0):
+        self.model = model
+        self.scaler = scaler
+        self.background = np.asarray(background, dtype=np.float64)
+        self.temperature = temperature
+
+    def status(self, answers, age, candidates):
+        """Where an assessment stands given the ``answers`` so far.
+
+        ``candidates`` are the features that may still be asked; any other
+        unanswered feature is taken as 0, as it will be submitted. Returns a
+        dict with the ``top_class`` (1-6), the ``agreement`` (fraction of
+        completions predicting it), ``settled``, and ``next_feature`` (None
+        once settled or out of questions) with the ``gains`` of every
+        unanswered candidate in bits.
+        """
+        started = metrics.clock()
+        submitted = np.asarray(feature_vector(answers, age), dtype=np.float64)
+        remaining = [f for f in candidates if f not in answers]
+        # Only the questions still to be asked vary; everything else is what gets submitted
+        pinned = np.ones(len(feature_order), dtype=bool)
+        pinned[[feature_order.index(f) for f in remaining]] = False
+        completions = self.background.copy()
+        completions[:, pinned] = submitted[pinned]
+        proba = predict_proba_matrix(self.model, self.scaler, np.vstack([completions, submitted]), self.temperature)
+        proba, as_submitted = proba[:-1], proba[-1]
+
+        votes = np.bincount(np.argmax(proba, axis=1), minlength=proba.shape[1])
+        top = int(np.argmax(votes))
+        agreement = votes[top] / len(proba)
+        settled = bool(agreement == 1.0 and np.argmax(as_submitted) == top)
+
+        gains = {}
+        if remaining:
+            columns = [feature_order.index(f) for f in remaining]
+            values = completions[:, columns].astype(np.int64)
+            # (features, options, classes) summed probabilities per answer option
+            one_hot = values[:, :, None] == np.arange(_max_options)
+            mass = np.einsum('nfv,nc->fvc', one_hot, proba)
+            counts = one_hot.sum(axis=0)
+            weights = counts / len(proba)
+            conditional = mass / np.maximum(counts, 1)[:, :, None]
+            expected = (weights * _entropy(conditional)).sum(axis=1)
+            gains = dict(zip(remaining, (_entropy(proba.mean(axis=0)) - expected).tolist()))
+        next_feature = None
+        if not settled and gains:
+            next_feature = max(remaining, key=gains.__getitem__)
+        metrics.observe('adaptive_status', started)
+        return {
+            'top_class': top + 1,
+            'agreement': float(agreement),
+            'settled': settled,
+            'next_feature': next_feature,
+            'gains': gains,
+        }
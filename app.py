@@ -1,8 +1,27 @@
+import logging
+import os
+import time
+import uuid
+
 import streamlit as st
-import joblib
 import numpy as np
 import pandas as pd
 
+from features import questions, disease_names, feature_order, feature_vector
+from inference import LazyModel, model_fingerprint, predict_matrix, predict_proba_matrix, serving_model_path, top_k
+from calibration import CALIBRATION_PATH, load_temperature, model_kind
+from fastpath import fused_arrays
+from whatif import IncrementalScorer
+from explain import explain_matrix, top_answers
+from adaptive import AdaptivePlanner, background_rows
+from prediction_cache import PredictionCache, pack_key
+from clinical_table import TABLE_PATH, ClinicalTable
+from registry import CandidateShadow, current_version, load_version, version_path
+from session_store import PackedAnswers, SessionStore, drop_widget_state, state_bytes, widget_key
+from audit_log import LOG_DIR, AuditLog
+from drift import REFERENCE_PATH, DriftMonitor
+import metrics
+
 # Page configuration
 st.set_page_config(
     page_title="Skin Disease Assessment",
@@ -10,18 +29,126 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load model and scaler
+# Opt-in stage timings (SDP_METRICS=1); see metrics.py
+metrics.start_exporters()
+run_started = metrics.clock()
+
+def rerun():
+    """``st.rerun()``, recording this run first: the rerun ends it by raising."""
+    metrics.observe('script_run', run_started)
+    st.rerun()
+
+# Model version from the registry (registry.py), or None to use the files next
+# to app.py. Everything model-specific below is cached per version, so
+# activating a new version takes effect on the next rerun without a restart.
+model_version = current_version()
+# Entries kept by each per-version cache below: the active version and the one
+# it replaced, so sessions mid-switch don't rebuild and old versions are freed
+PER_VERSION_ENTRIES = 2
+
+def artifact_path(name):
+    return os.path.join(version_path(model_version), name) if model_version is not None else name
+
+calibration_path = artifact_path(CALIBRATION_PATH)
+
+# Load model and scaler; the model loads and warms up in a background thread
+# so the questionnaire renders right away (predictions wait for it)
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_models(version):
+    if version is not None:
+        return LazyModel(lambda: load_version(version)[:2]), None
+    if serving_model_path() is None:
+        st.error("Model files not found! Please ensure 'skin_disease_model.pkl' and 'scaler.pkl' are in the same directory.")
+        return None, None
+    return LazyModel(), None
+
+model, scaler = load_models(model_version)
+
+# Prediction cache shared by all sessions; repeat answer vectors skip the model.
+# Entries hold calibrated probabilities too, so the cache is per temperature.
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_prediction_cache(version, temperature):
+    return PredictionCache(maxsize=4096, ttl=3600)
+
+# Identifies the loaded model to artifacts fitted for it (clinical table, calibration)
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_fingerprint(_model, version):
+    return model_fingerprint(_model, None)
+
+# Precomputed clinical-only predictions (built with clinical_table.py), if
+# present and built from the model being served. Checking that needs the
+# model, so until it has loaded every assessment goes to the model.
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_clinical_table(_model, path, modified, version):
+    try:
+        return ClinicalTable.load(path, load_fingerprint(_model, version))
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.getLogger(__name__).warning("Ignoring clinical table: %s", e)
+        return None
+
+table_path = artifact_path(TABLE_PATH)
+clinical_table = None
+if model is not None and model.ready:
+    table_modified = os.stat(table_path).st_mtime_ns if os.path.exists(table_path) else None
+    clinical_table = load_clinical_table(model, table_path, table_modified, model_version)
+
+# (temperature, calibrated): the temperature fitted with calibration.py for the
+# served model, or (1.0, False) when calibration.json is missing or was fitted
+# for another model, in which case the displayed probabilities are raw scores
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_calibration(_model, path, version):
+    temperature = load_temperature(path, kind=model_kind(_model.model), default=None,
+                                   fingerprint=load_fingerprint(_model, version))
+    return (1.0, False) if temperature is None else (temperature, True)
+
+# Fused model arrays shared by every session's live preview scorer
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_whatif_arrays(_model, version):
+    return fused_arrays(_model.model, _model.scaler)
+
+# Question ordering and early stopping for adaptive mode
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_adaptive_planner(_model, temperature, version):
+    return AdaptivePlanner(_model, None, background_rows(), temperature)
+
+# Candidate version scored in the background on submitted assessments (registry.py shadow);
+# a replaced candidate's thread pool is shut down rather than left to a cache eviction
+@st.cache_resource
+def load_shadow():
+    return CandidateShadow()
+
+shadow = load_shadow()
+shadow.refresh(model_version)
+
+# Rebuildable per-session objects, bounded across all sessions (idle ones are evicted)
+@st.cache_resource
+def load_session_store():
+    return SessionStore(max_sessions=int(os.environ.get('SDP_MAX_SESSIONS', 2000)),
+                        idle_ttl=float(os.environ.get('SDP_SESSION_IDLE_TTL', 1800)))
+
+session_store = load_session_store()
+
+# Append-only record of completed assessments, written by a background thread
+# (SDP_AUDIT_LOG sets the directory; empty disables it)
 @st.cache_resource
-def load_models():
+def load_audit_log():
+    log_dir = os.environ.get('SDP_AUDIT_LOG', LOG_DIR)
+    return AuditLog(log_dir) if log_dir else None
+
+audit_log = load_audit_log()
+
+# Running answer and prediction histograms compared with the training
+# distribution (drift_reference.json, written by train.py or drift.py)
+@st.cache_resource(max_entries=PER_VERSION_ENTRIES)
+def load_drift_monitor(path):
     try:
-        model = joblib.load('skin_disease_model.pkl')
-        scaler = joblib.load('scaler.pkl')
-        return model, scaler
+        return DriftMonitor.load(path)
     except FileNotFoundError:
-        st.error("Model files not found! Please ensure 'skin_disease_model.pkl' and 'scaler.pkl' are in the same directory.")
-        return None, None
+        return None
 
-model, scaler = load_models()
+drift_monitor = load_drift_monitor(artifact_path(REFERENCE_PATH))
 
 # Disease information with links and tips
 disease_info = {
@@ -93,198 +220,30 @@ disease_info = {
     }
 }
 
-# Questions mapped to features
-questions = {
-    'clinical': [
-        {
-            'feature': 'erythema',
-            'question': 'Do you have redness on your skin?',
-            'options': ['No redness', 'Slight redness', 'Moderate redness', 'Severe redness']
-        },
-        {
-            'feature': 'scaling',
-            'question': 'Is your skin flaking or peeling?',
-            'options': ['No scaling', 'Mild scaling', 'Moderate scaling', 'Heavy scaling']
-        },
-        {
-            'feature': 'definite_borders',
-            'question': 'Do the affected areas have clear, well-defined edges?',
-            'options': ['No clear borders', 'Slightly defined', 'Moderately defined', 'Very clear borders']
-        },
-        {
-            'feature': 'itching',
-            'question': 'How severe is the itching?',
-            'options': ['No itching', 'Mild itching', 'Moderate itching', 'Severe itching']
-        },
-        {
-            'feature': 'koebner_phenomenon',
-            'question': 'Do new lesions appear where your skin has been injured or scratched?',
-            'options': ['Never', 'Rarely', 'Sometimes', 'Frequently']
-        },
-        {
-            'feature': 'polygonal_papules',
-            'question': 'Do you have small, flat-topped bumps with multiple sides?',
-            'options': ['None', 'Few', 'Moderate amount', 'Many']
-        },
-        {
-            'feature': 'follicular_papules',
-            'question': 'Do you have bumps around hair follicles?',
-            'options': ['None', 'Few', 'Moderate amount', 'Many']
-        },
-        {
-            'feature': 'oral_mucosal_involvement',
-            'question': 'Do you have lesions or white patches inside your mouth?',
-            'options': ['No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'knee_elbow_involvement',
-            'question': 'Are your knees or elbows affected?',
-            'options': ['Not affected', 'Slightly affected', 'Moderately affected', 'Severely affected']
-        },
-        {
-            'feature': 'scalp_involvement',
-            'question': 'Is your scalp affected?',
-            'options': ['Not affected', 'Slightly affected', 'Moderately affected', 'Severely affected']
-        },
-        {
-            'feature': 'family_history',
-            'question': 'Do family members have similar skin conditions?',
-            'options': ['No family history', 'Distant relatives', 'Close relatives', 'Multiple family members']
-        }
-    ],
-    'histopathological': [
-        {
-            'feature': 'melanin_incontinence',
-            'question': 'Has a skin biopsy shown melanin pigment leakage?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'eosinophils_infiltrate',
-            'question': 'Did the biopsy show eosinophil cells?',
-            'options': ['Not tested/No', 'Few present', 'Moderate amount', 'Many present']
-        },
-        {
-            'feature': 'PNL_infiltrate',
-            'question': 'Did the biopsy show inflammatory white blood cells?',
-            'options': ['Not tested/No', 'Mild infiltration', 'Moderate infiltration', 'Heavy infiltration']
-        },
-        {
-            'feature': 'fibrosis_papillary_dermis',
-            'question': 'Did the biopsy show tissue scarring in the dermis?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'exocytosis',
-            'question': 'Did the biopsy show immune cells in the outer skin layer?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'acanthosis',
-            'question': 'Did the biopsy show thickening of the outer skin layer?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'hyperkeratosis',
-            'question': 'Did the biopsy show thickening of the top skin layer?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'parakeratosis',
-            'question': 'Did the biopsy show abnormal cell development?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'clubbing_rete_ridges',
-            'question': 'Did the biopsy show club-shaped ridges?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'elongation_rete_ridges',
-            'question': 'Did the biopsy show elongated skin ridges?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'thinning_suprapapillary_epidermis',
-            'question': 'Did the biopsy show thinning of skin above ridges?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'spongiform_pustule',
-            'question': 'Did the biopsy show sponge-like pus formations?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'munro_microabcess',
-            'question': 'Did the biopsy show small pus collections?',
-            'options': ['Not tested/No', 'Few', 'Moderate', 'Many']
-        },
-        {
-            'feature': 'focal_hypergranulosis',
-            'question': 'Did the biopsy show localized thickening?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'disappearance_granular_layer',
-            'question': 'Did the biopsy show loss of a skin layer?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Complete']
-        },
-        {
-            'feature': 'vacuolisation_damage_basal_layer',
-            'question': 'Did the biopsy show damage to the base skin layer?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'spongiosis',
-            'question': 'Did the biopsy show fluid between skin cells?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'saw_tooth_appearance_retes',
-            'question': 'Did the biopsy show saw-tooth shaped ridges?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'follicular_horn_plug',
-            'question': 'Did the biopsy show plugged hair follicles?',
-            'options': ['Not tested/No', 'Few', 'Moderate', 'Many']
-        },
-        {
-            'feature': 'perifollicular_parakeratosis',
-            'question': 'Did the biopsy show abnormal cells around follicles?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'inflammatory_mononuclear_infiltrate',
-            'question': 'Did the biopsy show immune cell infiltration?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        },
-        {
-            'feature': 'band_like_infiltrate',
-            'question': 'Did the biopsy show a band of immune cells?',
-            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
-        }
-    ]
-}
-
-# Disease names
-disease_names = [
-    'Psoriasis',
-    'Seborrheic dermatitis',
-    'Lichen planus',
-    'Pityriasis rosea',
-    'Chronic dermatitis',
-    'Pityriasis rubra pilaris'
-]
-
-# Initialize session state
+# Initialize session state; answers are bit-packed, see session_store.py
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+session = session_store.get(st.session_state.session_id)
 if 'answers' not in st.session_state:
-    st.session_state.answers = {}
+    st.session_state.answers = PackedAnswers()
 if 'age' not in st.session_state:
     st.session_state.age = 30
 if 'show_lab_section' not in st.session_state:
     st.session_state.show_lab_section = False
 if 'show_results' not in st.session_state:
     st.session_state.show_results = False
+if 'adaptive' not in st.session_state:
+    st.session_state.adaptive = False
+if 'asked' not in st.session_state:
+    st.session_state.asked = []
+
+def session_scorer():
+    """This session's incremental scorer for the current model version."""
+    if session.get('whatif_version', 'none') != model_version:
+        session['whatif'] = IncrementalScorer(load_whatif_arrays(model, model_version),
+                                              load_calibration(model, calibration_path, model_version)[0])
+        session['whatif_version'] = model_version
+    return session['whatif']
 
 # Main title
 st.title("Skin Disease Assessment Tool")
@@ -310,8 +269,20 @@ with st.sidebar:
     
     st.markdown("---")
     st.warning("**Important:** This tool is for educational purposes only. Always consult a healthcare professional for proper diagnosis and treatment.")
+    
+    if model is not None:
+        status = model.status()
+        if status['state'] == 'ready':
+            st.caption(f"Model ready: loaded in {status['load_seconds']:.2f}s, warmed up in {status['warmup_seconds']:.2f}s")
+        elif status['state'] == 'loading':
+            st.caption("Model loading...")
+        else:
+            st.caption(f"Model failed to load: {status['error']}")
+    
+    # Live preview, filled in once this run's answers are known
+    live_panel = st.container()
 
-if model is not None and scaler is not None:
+if model is not None:
     
     # Clinical Symptoms Section
     if not st.session_state.show_results:
@@ -328,21 +299,56 @@ if model is not None and scaler is not None:
             key='age_input'
         )
         
+        st.session_state.adaptive = st.checkbox(
+            "Adaptive mode: ask the most informative questions first and stop once the result is settled",
+            value=st.session_state.adaptive,
+            key='adaptive_input'
+        )
+        # Until the model has loaded, adaptive mode shows every question
+        adaptive = st.session_state.adaptive and model.ready
+        
         st.markdown("---")
         
         # Clinical questions
+        render_started = metrics.clock()
         for q in questions['clinical']:
+            if adaptive and q['feature'] not in st.session_state.asked:
+                continue
             st.markdown(f"**{q['question']}**")
             answer = st.radio(
                 "",
                 options=range(len(q['options'])),
                 format_func=lambda x, opts=q['options']: opts[x],
-                key=f"q_{q['feature']}",
+                key=widget_key(q['feature']),
                 horizontal=False,
                 index=st.session_state.answers.get(q['feature'], 0)
             )
             st.session_state.answers[q['feature']] = answer
             st.markdown("")
+        metrics.observe('render_clinical_questions', render_started)
+        
+        if adaptive:
+            candidates = [q['feature'] for q in questions['clinical']]
+            if st.session_state.show_lab_section:
+                candidates += [q['feature'] for q in questions['histopathological']]
+            # Lab radios render further down, so read their current values from widget state
+            known = {f: st.session_state.get(widget_key(f), st.session_state.answers.get(f, 0))
+                     for f in st.session_state.asked}
+            planner = load_adaptive_planner(model, load_calibration(model, calibration_path, model_version)[0], model_version)
+            status = planner.status(known, st.session_state.age, candidates)
+            if not st.session_state.asked and status['next_feature'] is not None:
+                st.session_state.asked.append(status['next_feature'])
+                rerun()
+            if status['settled']:
+                st.success(f"Your {len(known)} answers already settle the assessment; "
+                           "the remaining questions would not change the result.")
+            else:
+                st.caption(f"{status['agreement']:.0%} of plausible answers to the remaining questions "
+                           "lead to the same result.")
+                if status['next_feature'] is not None:
+                    # Callback, not st.rerun(): the button stays on the page (see "Add Lab Results")
+                    st.button("Next Question", on_click=st.session_state.asked.append,
+                              args=(status['next_feature'],))
         
         st.markdown("---")
         
@@ -351,18 +357,17 @@ if model is not None and scaler is not None:
         col1, col2 = st.columns(2)
         
         with col1:
-            if st.button("Add Lab Results (Optional)", use_container_width=True, type="secondary"):
-                st.session_state.show_lab_section = True
-                st.rerun()
+            # A callback rather than st.rerun(): the button stays on the page, and on
+            # Streamlit 1.28 rerunning from inside it re-triggers the click forever
+            st.button("Add Lab Results (Optional)", use_container_width=True, type="secondary",
+                      on_click=lambda: setattr(st.session_state, 'show_lab_section', True))
         
         with col2:
             if st.button("Get Results Now", use_container_width=True, type="primary"):
-                # Set all lab results to 0 (not tested)
-                for q in questions['histopathological']:
-                    if q['feature'] not in st.session_state.answers:
-                        st.session_state.answers[q['feature']] = 0
+                # Lab results stay unanswered; feature_vector submits them as 0 (not tested)
                 st.session_state.show_results = True
-                st.rerun()
+                st.session_state.logged = False
+                rerun()
     
     # Lab Results Section (only shown if user clicks the button)
     if st.session_state.show_lab_section and not st.session_state.show_results:
@@ -371,18 +376,22 @@ if model is not None and scaler is not None:
         st.markdown("")
         
         # Histopathological questions
+        render_started = metrics.clock()
         for q in questions['histopathological']:
+            if adaptive and q['feature'] not in st.session_state.asked:
+                continue
             st.markdown(f"**{q['question']}**")
             answer = st.radio(
                 "",
                 options=range(len(q['options'])),
                 format_func=lambda x, opts=q['options']: opts[x],
-                key=f"q_{q['feature']}",
+                key=widget_key(q['feature']),
                 horizontal=False,
                 index=st.session_state.answers.get(q['feature'], 0)
             )
             st.session_state.answers[q['feature']] = answer
             st.markdown("")
+        metrics.observe('render_lab_questions', render_started)
         
         st.markdown("---")
         
@@ -390,23 +399,35 @@ if model is not None and scaler is not None:
         with col2:
             if st.button("Get Assessment Results", use_container_width=True, type="primary"):
                 st.session_state.show_results = True
-                st.rerun()
+                st.session_state.logged = False
+                rerun()
+    
+    # Live "what-if" preview: re-scored incrementally from the previous answers
+    if not st.session_state.show_results and model.ready:
+        preview_started = metrics.clock()
+        live_proba = session_scorer().score(feature_vector(st.session_state.answers, st.session_state.age))
+        with live_panel:
+            st.markdown("---")
+            st.markdown("### Current Most Likely Condition")
+            if sum(st.session_state.answers.get(q['feature'], 0) for q in questions['clinical']) <= 2:
+                st.caption("Answer a few more symptom questions to see a preview.")
+            else:
+                live_class = int(np.argmax(live_proba))
+                st.metric(disease_names[live_class], f"{live_proba[live_class]:.1%}")
+                st.caption("Updates as you answer. Press the results button for the full assessment.")
+        metrics.observe('live_preview', preview_started)
     
     # Results Section
     if st.session_state.show_results:
+        # The radios aren't shown here and restore themselves from the packed answers
+        drop_widget_state(st.session_state)
         # Prepare input data
-        feature_order = [q['feature'] for q in questions['clinical']] + ['age'] + [q['feature'] for q in questions['histopathological']]
-        
-        input_values = []
-        for feature in feature_order:
-            if feature == 'age':
-                input_values.append(st.session_state.age)
-            else:
-                input_values.append(st.session_state.answers.get(feature, 0))
-        
-        input_data = [input_values]
+        input_data = [feature_vector(st.session_state.answers, st.session_state.age)]
+        # Questions the user actually answered (drift monitoring ignores the rest)
+        answered = [[f == 'age' or f in st.session_state.answers for f in feature_order]]
         
         # Scale and predict
+        results_started = metrics.clock()
         try:
             # Check if user has minimal symptoms (might not have a skin disease)
             clinical_answers = [st.session_state.answers.get(q['feature'], 0) for q in questions['clinical']]
@@ -414,6 +435,11 @@ if model is not None and scaler is not None:
             
             # If very few symptoms, show a different message
             if total_symptom_score <= 2:  # Almost no symptoms
+                metrics.count('low_symptom_exit')
+                if not st.session_state.get('logged', True):
+                    if drift_monitor is not None:
+                        drift_monitor.update(input_data, answered=answered)
+                    st.session_state.logged = True
                 st.info("## Assessment Complete")
                 st.markdown("")
                 st.markdown("### Good News!")
@@ -438,22 +464,61 @@ if model is not None and scaler is not None:
                 """)
                 
                 st.markdown("---")
+                metrics.observe('render_low_symptom_results', results_started)
                 
                 # New assessment button for low symptom case
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
                     if st.button("Start New Assessment", use_container_width=True, type="secondary", key="restart_low"):
-                        st.session_state.answers = {}
+                        st.session_state.answers = PackedAnswers()
                         st.session_state.age = 30
                         st.session_state.show_lab_section = False
                         st.session_state.show_results = False
-                        st.rerun()
+                        st.session_state.asked = []
+                        rerun()
                 
             else:
                 # Proceed with normal prediction
-                scaled_data = scaler.transform(input_data)
-                prediction = model.predict(scaled_data)
-                predicted_disease = disease_names[prediction[0] - 1]
+                model.wait()
+                temperature, calibrated = load_calibration(model, calibration_path, model_version)
+                # Widgets rerun this page; score each assessment once and keep it in the session
+                assessment_key = (model_version, pack_key(input_data[0]))
+                assessment = st.session_state.get('assessment')
+                if assessment is None or assessment['key'] != assessment_key:
+                    predict_started = metrics.clock()
+                    assessment_started = time.perf_counter()
+                    prediction = None
+                    if clinical_table is not None:
+                        prediction = clinical_table.lookup(st.session_state.answers, st.session_state.age)
+                    if prediction is not None:
+                        metrics.count('clinical_table_hit')
+                        # The preview scorer already holds these answers, so this skips the model
+                        probabilities = session_scorer().score(input_data[0])[None, :]
+                    else:
+                        predictions, probabilities = load_prediction_cache(model_version, temperature).predict_proba(
+                            input_data, lambda X: predict_matrix(model, scaler, X),
+                            lambda X: predict_proba_matrix(model, scaler, X, temperature))
+                        prediction = int(predictions[0])
+                    metrics.observe('predict', predict_started)
+                    assessment = st.session_state.assessment = {
+                        'key': assessment_key,
+                        'prediction': prediction,
+                        'probabilities': probabilities,
+                        'seconds': time.perf_counter() - assessment_started,
+                    }
+                prediction, probabilities = assessment['prediction'], assessment['probabilities']
+                predicted_disease = disease_names[prediction - 1]
+                ranked_classes, ranked_probabilities = top_k(probabilities, k=len(disease_names))
+                # Results reruns on every widget interaction; log each assessment once
+                if not st.session_state.get('logged', True):
+                    shadow.submit(input_data, [prediction])
+                    if audit_log is not None:
+                        audit_log.record(input_data[0], prediction, model_version,
+                                         assessment['seconds'], probabilities[0, prediction - 1])
+                    if drift_monitor is not None:
+                        drift_monitor.update(input_data, [prediction], answered)
+                    st.session_state.logged = True
+                render_started = metrics.clock()
                 
                 # Show results
                 st.success(f"## Assessment Complete")
@@ -484,8 +549,40 @@ if model is not None and scaler is not None:
                     st.markdown(f"**[Learn More About {predicted_disease}]({info['link']})**")
                 
                 with col2:
-                    st.metric("Model Confidence", "98.61%")
-                    st.metric("Disease Class", f"Class {prediction[0]}")
+                    if calibrated:
+                        st.metric("Model Confidence", f"{probabilities[0, prediction - 1]:.1%}")
+                    else:
+                        st.metric("Model Confidence (uncalibrated)", f"{probabilities[0, prediction - 1]:.1%}",
+                                  help="Raw model score, not a calibrated probability; see calibration.py.")
+                    st.metric("Disease Class", f"Class {prediction}")
+                
+                st.markdown("---")
+                
+                # Likelihood of every condition for this patient
+                st.markdown("### Likelihood of Each Condition")
+                for class_id, probability in zip(ranked_classes[0].tolist(), ranked_probabilities[0].tolist()):
+                    st.progress(probability, text=f"{disease_names[class_id - 1]}: {probability:.1%}")
+                if not calibrated:
+                    st.caption("Uncalibrated model scores: use them to compare conditions, not as probabilities.")
+                
+                # Answers that most support this prediction, from one batched what-if pass.
+                # That pass runs the model, so it runs on request, once per assessment.
+                st.markdown("### Answers That Most Influenced This Result")
+                if 'explanation' not in assessment:
+                    st.button("Show Influential Answers", key="explain",
+                              on_click=assessment.__setitem__, args=('explanation', None))
+                else:
+                    if assessment['explanation'] is None:
+                        assessment['explanation'] = explain_matrix(model, scaler, input_data, temperature,
+                                                                   target=prediction)
+                    influential = top_answers(assessment['explanation'], 0, st.session_state.answers, k=5)
+                    if influential:
+                        for item in influential:
+                            st.markdown(f"- **{item['question']}** {item['answer']}: "
+                                        f"+{item['contribution']:.1%} toward {predicted_disease}")
+                        st.caption("How much lower the confidence would be if each answer were 'none' or 'not tested'.")
+                    else:
+                        st.caption("No single answer stands out; the result reflects the answers as a whole.")
                 
                 st.markdown("---")
                 
@@ -526,22 +623,26 @@ if model is not None and scaler is not None:
                     """)
                 
                 st.markdown("---")
+                metrics.observe('render_results', render_started)
                 
                 # New assessment button for disease prediction case
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
                     if st.button("Start New Assessment", use_container_width=True, type="secondary", key="restart_disease"):
-                        st.session_state.answers = {}
+                        st.session_state.answers = PackedAnswers()
                         st.session_state.age = 30
                         st.session_state.show_lab_section = False
                         st.session_state.show_results = False
-                        st.rerun()
+                        st.session_state.asked = []
+                        rerun()
             
         except Exception as e:
+            metrics.count('assessment_error')
+            metrics.observe('assessment_error', results_started)
             st.error(f"Error during assessment: {str(e)}")
             if st.button("Try Again"):
                 st.session_state.show_results = False
-                st.rerun()
+                rerun()
 
 else:
     st.error("Unable to load model files. Please ensure the model has been trained and saved.")
@@ -553,4 +654,11 @@ st.markdown("""
     <p>Model trained on UCI Dermatology Dataset | Accuracy: 98.61%</p>
     <p>This tool is for educational and research purposes only</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Per-session memory, excluding the model arrays every preview scorer shares
+whatif = session.get('whatif')
+session_store.report(st.session_state.session_id, state_bytes(st.session_state.to_dict()),
+                     exclude=[whatif.arrays] if whatif is not None else [])
+
+metrics.observe('script_run', run_started)
@@ -0,0 +1,180 @@
+"""Append-only log of completed assessments, written in the background.
+
+``AuditLog.record`` only puts the assessment on a queue, so the Streamlit
+script never waits on disk. A writer thread collects records until
+``batch_size`` are queued or ``flush_interval`` seconds have passed and
+writes them as one new segment file: an ``.npz`` of columns (int8 answer
+matrix in ``feature_order``, predicted class, confidence, latency, model
+version and timestamp). Segments are written to a temporary name and
+renamed into place, never modified afterwards, and named by time and process
+id, so several app processes can share one log directory.
+
+``load_log`` reads every segment back into one DataFrame whose first columns
+match ``features.columns`` (``class`` is the predicted class), so the
+notebook and ``dataset.train_test`` can use it like the UCI data:
+    from audit_log import load_log
+    logged = load_log()
+    x_train, x_test, y_train, y_test = train_test(logged[columns])
+"""
+
+import atexit
+import glob
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from features import columns, feature_order
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR = 'assessment_log'
+SEGMENT_PATTERN = 'assessments-*.npz'
+# ``load_log`` layout: the training frame's columns, then per-assessment details
+LOG_COLUMNS = columns + ['confidence', 'latency', 'model_version', 'timestamp']
+_LOG_DTYPES = dict(dict.fromkeys(feature_order, np.float64), **{
+    'class': np.int64, 'confidence': np.float32, 'latency': np.float32, 'model_version': object,
+    'timestamp': np.float64})
+
+
+class AuditLog:
+    """Queue assessments and write them in batches from a background thread.
+
+    At most ``max_queue`` records wait for the writer; beyond that new ones
+    are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, batch_size=256, flush_interval=10.0, max_queue=10000):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(log_dir, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.segments = 0
+        self.errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+        # Don't lose the last partial batch when the server shuts down
+        atexit.register(self.close)
+
+    def record(self, row, predicted_class, model_version=None, latency=None, confidence=None):
+        """Queue one assessment; ``row`` is the 34-value input in ``feature_order``."""
+        item = (np.asarray(row, dtype=np.int8).ravel(), int(predicted_class),
+                float('nan') if confidence is None else float(confidence),
+                float('nan') if latency is None else float(latency),
+                model_version or '', time.time())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            metrics.count('audit_dropped')
+            return
+        with self._lock:
+            self.recorded += 1
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._collect()
+            if not batch:
+                continue
+            started = metrics.clock()
+            try:
+                self._write(batch)
+            except Exception as e:
+                with self._lock:
+                    self.errors += len(batch)
+                metrics.count('audit_error', len(batch))
+                logger.warning("Could not write %d assessments to %s: %s", len(batch), self.log_dir, e)
+                continue
+            metrics.observe('audit_write', started)
+            with self._lock:
+                self.written += len(batch)
+                self.segments += 1
+
+    def _write(self, batch):
+        rows, classes, confidence, latency, versions, timestamps = zip(*batch)
+        name = f'assessments-{time.time_ns()}-{os.getpid()}.npz'
+        fd, tmp = tempfile.mkstemp(dir=self.log_dir, prefix='.', suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f,
+                     features=np.vstack(rows),
+                     predicted_class=np.asarray(classes, dtype=np.int8),
+                     confidence=np.asarray(confidence, dtype=np.float32),
+                     latency=np.asarray(latency, dtype=np.float32),
+                     model_version=np.asarray(versions, dtype=str),
+                     timestamp=np.asarray(timestamps, dtype=np.float64))
+        os.replace(tmp, os.path.join(self.log_dir, name))
+
+    def close(self):
+        """Flush everything queued so far and stop the writer."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'recorded': self.recorded,
+                'dropped': self.dropped,
+                'written': self.written,
+                'segments': self.segments,
+                'errors': self.errors,
+                'queued': self._queue.qsize(),
+            }
+
+
+def load_log(log_dir=LOG_DIR):
+    """Every logged assessment, oldest first, as a DataFrame.
+
+    Columns are ``LOG_COLUMNS``: ``features.columns`` (the same layout as
+    ``dataset.load_frame``, ``class`` holding the predicted class) followed by
+    ``confidence``, ``latency``, ``model_version`` and ``timestamp``, with
+    the same dtypes whether or not anything has been logged.
+    """
+    frames = []
+    for path in sorted(glob.glob(os.path.join(log_dir, SEGMENT_PATTERN))):
+        with np.load(path) as segment:
+            data = dict(zip(feature_order, segment['features'].T))
+            data['class'] = segment['predicted_class']
+            for name in LOG_COLUMNS[len(columns):]:
+                data[name] = segment[name]
+        frames.append(pd.DataFrame(data, columns=LOG_COLUMNS).astype(_LOG_DTYPES))
+    if not frames:
+        return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in _LOG_DTYPES.items()})[LOG_COLUMNS]
+    log = pd.concat(frames, ignore_index=True)
+    return log.sort_values('timestamp', kind='stable', ignore_index=True)
@@ -0,0 +1,120 @@
+"""Headless batch scoring of dermatology feature records.
+
+Reads CSV or Parquet files whose columns include every name in
+``feature_order``, scores them in fixed-size chunks through the trained model
+and scaler, and writes the input columns back out with ``predicted_class`` and
+``predicted_disease`` appended.
+
+Usage:
+    python batch_score.py intake.csv predictions.csv
+    python batch_score.py intake.parquet predictions.parquet --chunk-size 8192
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from features import feature_order
+from inference import MODEL_PATH, SCALER_PATH, class_names, load_artifacts, predict_matrix
+
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def iter_records(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrame chunks of at most ``chunk_size`` rows from a CSV or Parquet file."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def score_frame(df, model, scaler):
+    """Return a copy of ``df`` with prediction columns appended."""
+    missing = [f for f in feature_order if f not in df.columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+    X = df[feature_order].apply(pd.to_numeric, errors='coerce')
+    if X.isna().any().any():
+        bad = X.index[X.isna().any(axis=1)].tolist()[:5]
+        raise ValueError(f"Non-numeric or empty feature values in rows {bad}")
+    predictions = predict_matrix(model, scaler, X.to_numpy())
+    out = df.copy()
+    out['predicted_class'] = predictions
+    out['predicted_disease'] = class_names(predictions)
+    return out
+
+
+class _Writer:
+    """Append scored chunks to a CSV or Parquet output file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._started = False
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_file(input_path, output_path, model=None, scaler=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score every record in ``input_path`` and write them to ``output_path``.
+
+    Returns the number of records scored.
+    """
+    if model is None:
+        model, scaler = load_artifacts()
+    writer = _Writer(output_path)
+    total = 0
+    try:
+        for chunk in iter_records(input_path, chunk_size):
+            writer.write(score_frame(chunk, model, scaler))
+            total += len(chunk)
+    finally:
+        writer.close()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score dermatology feature records.")
+    parser.add_argument('input', help="CSV or Parquet file with one column per feature")
+    parser.add_argument('output', help="CSV or Parquet file to write predictions to")
+    parser.add_argument('--model', default=MODEL_PATH, help="path to the pickled model or a fastpath .npz export")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="path to the pickled scaler")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows scored per vectorized call (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    model, scaler = load_artifacts(args.model, args.scaler)
+    total = score_file(args.input, args.output, model, scaler, args.chunk_size)
+    print(f"Scored {total} records -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Inference latency and throughput benchmarks.
+
+Measures, for each model artifact given:
+
+* cold load: a fresh interpreter importing ``inference`` and calling
+  ``load_artifacts`` (wall time and resident memory added by the load;
+  memory is read from ``/proc`` and so only reported on Linux)
+* on-disk artifact size
+* single-row latency percentiles for ``predict_matrix``
+* batch throughput at several batch sizes
+
+Inputs are synthetic questionnaire vectors drawn from the ``questions``
+option ranges. Results are written as JSON; ``--baseline`` compares against
+an earlier results file and exits non-zero on regressions.
+
+Usage:
+    python benchmark.py --model rf=rf_model.pkl --model svm=svm_model.pkl --out bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from features import random_answers
+from inference import MODEL_PATH, SCALER_PATH, load_artifacts, predict_matrix
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BATCH_SIZES = (1, 8, 64, 512, 4096)
+
+_COLD_LOAD = """
+import os, sys, time
+sys.path.insert(0, {here!r})
+
+def rss_kib():
+    # Current resident set; ru_maxrss is unreliable here because Linux keeps
+    # the parent's peak across fork/exec
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return 0
+
+rss_before = rss_kib()
+started = time.perf_counter()
+from inference import load_artifacts
+model, scaler = load_artifacts({model!r}, {scaler!r})
+elapsed = time.perf_counter() - started
+print(elapsed, rss_kib() - rss_before)
+"""
+
+
+def cold_load(model_path, scaler_path, repeats=3):
+    """Best-of-``repeats`` load time and RSS growth (KiB) in a fresh interpreter."""
+    times, rss = [], []
+    code = _COLD_LOAD.format(here=HERE, model=model_path, scaler=scaler_path)
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        elapsed, rss_kib = out.split()
+        times.append(float(elapsed))
+        rss.append(int(rss_kib))
+    return {'seconds': min(times), 'rss_kib': min(rss)}
+
+
+def artifact_bytes(model_path, scaler_path):
+    """Bytes on disk for a model: the pickles, a ``.npz`` export or every file of a directory export."""
+    if os.path.isdir(model_path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(model_path) for name in names)
+    paths = [model_path] if model_path.endswith('.npz') else [model_path, scaler_path]
+    return sum(os.path.getsize(p) for p in paths)
+
+
+def single_row_latency(model, scaler, rows, warmup=20):
+    for row in rows[:warmup]:
+        predict_matrix(model, scaler, row)
+    timings = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        started = time.perf_counter()
+        predict_matrix(model, scaler, row)
+        timings[i] = time.perf_counter() - started
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99]) * 1000.0
+    return {'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'mean_ms': timings.mean() * 1000.0}
+
+
+def batch_throughput(model, scaler, X, batch_sizes=BATCH_SIZES, min_seconds=0.5):
+    """Rows per second at each batch size, repeating until ``min_seconds`` have passed."""
+    results = {}
+    for size in batch_sizes:
+        batch = X[:size]
+        predict_matrix(model, scaler, batch)
+        rows, started = 0, time.perf_counter()
+        while True:
+            predict_matrix(model, scaler, batch)
+            rows += len(batch)
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_seconds:
+                break
+        results[str(size)] = rows / elapsed
+    return results
+
+
+def run(models, n_rows=1000, batch_sizes=BATCH_SIZES, seed=0):
+    """Benchmark ``{name: (model_path, scaler_path)}``; returns a JSON-ready dict."""
+    import sklearn
+
+    X = random_answers(max(n_rows, max(batch_sizes)), seed)
+    singles = X[:n_rows, None, :]
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scikit-learn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'models': {},
+    }
+    for name, (model_path, scaler_path) in models.items():
+        model, scaler = load_artifacts(model_path, scaler_path)
+        report['models'][name] = {
+            'model_type': type(model).__name__,
+            'artifact_bytes': artifact_bytes(model_path, scaler_path),
+            'cold_load': cold_load(model_path, scaler_path),
+            'single_row': single_row_latency(model, scaler, singles),
+            'throughput_rows_per_s': batch_throughput(model, scaler, X, batch_sizes),
+        }
+    return report
+
+
+def regressions(current, baseline, tolerance):
+    """List metrics in ``current`` more than ``tolerance`` worse than ``baseline``."""
+    found = []
+    for name, now in current['models'].items():
+        before = baseline.get('models', {}).get(name)
+        if before is None:
+            continue
+        checks = [('cold_load.seconds', now['cold_load']['seconds'], before['cold_load']['seconds'], True),
+                  ('single_row.p99_ms', now['single_row']['p99_ms'], before['single_row']['p99_ms'], True)]
+        for size, rate in now['throughput_rows_per_s'].items():
+            if size in before['throughput_rows_per_s']:
+                checks.append((f'throughput_rows_per_s.{size}', rate, before['throughput_rows_per_s'][size], False))
+        for metric, value, reference, lower_is_better in checks:
+            change = (value - reference) / reference if reference else 0.0
+            if (change if lower_is_better else -change) > tolerance:
+                found.append(f"{name} {metric}: {reference:.4g} -> {value:.4g} ({change:+.0%})")
+    return found
+
+
+def _print_report(report):
+    for name, r in report['models'].items():
+        print(f"\n{name} ({r['model_type']}, {r['artifact_bytes'] / 1024:.0f} KiB on disk)")
+        print(f"  cold load:   {r['cold_load']['seconds'] * 1000:.1f} ms, +{r['cold_load']['rss_kib'] / 1024:.1f} MiB RSS")
+        s = r['single_row']
+        print(f"  single row:  p50 {s['p50_ms']:.3f} ms, p90 {s['p90_ms']:.3f} ms, p99 {s['p99_ms']:.3f} ms")
+        for size, rate in r['throughput_rows_per_s'].items():
+            print(f"  batch {size:>5}: {rate:,.0f} rows/s")
+
+
+def _parse_model(text):
+    name, sep, path = text.partition('=')
+    return (name, path) if sep else (os.path.splitext(os.path.basename(text))[0], text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model load time, latency and throughput.")
+    parser.add_argument('--model', action='append', type=_parse_model,
+                        help="[name=]path of a pickled model or .npz export; repeat to compare "
+                             f"(default: {MODEL_PATH})")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="scaler used with pickled models")
+    parser.add_argument('--rows', type=int, default=1000, help="single-row predictions timed per model")
+    parser.add_argument('--batch-sizes', type=lambda s: [int(v) for v in s.split(',')], default=list(BATCH_SIZES),
+                        help="comma-separated batch sizes (default: %(default)s)")
+    parser.add_argument('--out', default='benchmark_results.json', help="results JSON path")
+    parser.add_argument('--baseline', help="earlier results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative slowdown before a regression is reported (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        if os.path.abspath(args.baseline) == os.path.abspath(args.out):
+            parser.error("--out would overwrite --baseline; write this run to another file")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    models = dict(args.model or [_parse_model(MODEL_PATH)])
+    report = run({name: (path, args.scaler) for name, path in models.items()}, args.rows, args.batch_sizes)
+    _print_report(report)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if baseline is not None:
+        found = regressions(report, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
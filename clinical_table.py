@@ -0,0 +1,262 @@
+"""Precomputed lookup table for clinical-only assessments.
+
+When every histopathological answer is 0 ("Get Results Now", or all lab
+questions left at "Not tested/No"), the prediction depends only on the 11
+clinical answers and age. ``build_table`` evaluates the model on every
+combination of clinical answers for each age group and stores the class ids in
+a memory-mapped ``uint8`` array, so the app can answer those assessments with
+one array lookup.
+
+A table is only valid for the model it was built from. ``build_table``
+records a fingerprint of that model (``inference.model_fingerprint``, shared
+by every export of the same model) in a ``.meta.json`` sidecar, and ``ClinicalTable.load`` refuses a table whose
+fingerprint does not match the model being served.
+
+Each tabulated age group costs 4 MiB, so by default only ages in
+``TABLE_AGES`` (18-80) are tabulated; other ages fall back to the model.
+
+For random forests, ages that fall between the same pair of age split
+thresholds always get the same prediction, so they share one table row; other
+models get one row per age. Forest rows are filled tree by tree: each leaf
+covers a box of clinical answers, and its class fractions are added to that
+whole box at once instead of walking the tree for millions of rows.
+
+Usage:
+    python clinical_table.py --model skin_disease_model.pkl --scaler scaler.pkl --out clinical_table.npy
+    python clinical_table.py --ages 1-120   # tabulate every questionnaire age
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+import fastpath
+from features import questions, feature_order, option_counts, AGE_MIN, AGE_MAX
+from inference import model_fingerprint, predict_matrix
+
+TABLE_PATH = 'clinical_table.npy'
+
+# Ages tabulated by default; assessments for other ages use the model
+TABLE_AGES = range(18, 81)
+
+clinical_features = [q['feature'] for q in questions['clinical']]
+_clinical_columns = np.array([feature_order.index(f) for f in clinical_features])
+_radix = np.array([option_counts[f] for f in clinical_features], dtype=np.int64)
+_place = np.concatenate([[1], np.cumprod(_radix[:-1])])
+n_combinations = int(np.prod(_radix))
+
+
+def _ages_path(path):
+    return path[:-len('.npy')] + '.ages.npy' if path.endswith('.npy') else path + '.ages.npy'
+
+
+def _meta_path(path):
+    return path[:-len('.npy')] + '.meta.json' if path.endswith('.npy') else path + '.meta.json'
+
+
+def combination_index(answers):
+    """Index of a clinical answer dict in the table's mixed-radix layout."""
+    return int(sum(answers.get(f, 0) * p for f, p in zip(clinical_features, _place.tolist())))
+
+
+def _decode(indices):
+    """Clinical answer digits, one row per table index."""
+    return (indices[:, None] // _place) % _radix
+
+
+def _age_thresholds(model, scaler):
+    """Age split thresholds and a function mapping ages onto the comparison space.
+
+    Returns None when the model's dependence on age is not piecewise constant.
+    """
+    age = feature_order.index('age')
+    if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+        thresholds = np.concatenate([e.tree_.threshold[e.tree_.feature == age] for e in model.estimators_])
+        mean, scale = scaler.mean_[age], scaler.scale_[age]
+    elif getattr(model, 'kind', None) == 'forest':
+        a = model.arrays
+        thresholds = a['threshold'][np.isfinite(a['threshold']) & (a['feature'] == age)]
+        if model.fused:
+            return thresholds, lambda ages: ages
+        mean, scale = model.mean[age], model.scale[age]
+    else:
+        return None
+    # Trees compare float32 scaled inputs against float64 thresholds
+    return thresholds, lambda ages: ((ages - mean) / scale).astype(np.float32).astype(np.float64)
+
+
+def age_groups(model, scaler, ages):
+    """Map each age onto a group of ages the model cannot tell apart.
+
+    Returns ``(group_of_age, representative_ages)``.
+    """
+    ages = np.asarray(ages, dtype=np.float64)
+    found = _age_thresholds(model, scaler)
+    if found is None:
+        return np.arange(len(ages)), ages
+    thresholds, to_split_space = found
+    signature = to_split_space(ages)[:, None] <= np.unique(thresholds)[None, :]
+    _, first, group = np.unique(signature, axis=0, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return remap[group.ravel()], ages[np.sort(first)]
+
+
+def _fused_forest(model, scaler):
+    """Fused fastpath arrays for a forest model, or None for other models."""
+    if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+        return fastpath.model_arrays(model, scaler, fuse=True)
+    if getattr(model, 'kind', None) == 'forest':
+        if model.fused:
+            return model.arrays
+        arrays = dict(model.arrays)
+        fastpath._fuse_forest(arrays, model.mean, model.scale)
+        return arrays
+    return None
+
+
+def _forest_row(arrays, age):
+    """Predicted class ids for every clinical combination at one age."""
+    a = arrays
+    left, right, feature, threshold, value = a['left'], a['right'], a['feature'], a['threshold'], a['value']
+    fixed = np.zeros(len(feature_order))
+    fixed[feature_order.index('age')] = age
+    axis_of = {int(c): len(_radix) - 1 - j for j, c in enumerate(_clinical_columns)}
+    # Most significant digit first, so a C-order ravel gives the table index
+    proba = np.zeros(tuple(_radix[::-1]) + (value.shape[1],))
+    for root in a['roots'].tolist():
+        stack = [(root, [0] * len(_radix), (_radix[::-1] - 1).tolist())]
+        while stack:
+            node, lo, hi = stack.pop()
+            if left[node] == node:
+                proba[tuple(slice(l, h + 1) for l, h in zip(lo, hi))] += value[node]
+                continue
+            f, t = int(feature[node]), threshold[node]
+            axis = axis_of.get(f)
+            if axis is None:
+                stack.append((left[node] if fixed[f] <= t else right[node], lo, hi))
+                continue
+            cut = int(np.floor(t))
+            if lo[axis] <= cut:
+                stack.append((left[node], lo, hi[:axis] + [min(hi[axis], cut)] + hi[axis + 1:]))
+            if hi[axis] > cut:
+                stack.append((right[node], lo[:axis] + [max(lo[axis], cut + 1)] + lo[axis + 1:], hi))
+    proba /= a['roots'].size
+    return a['classes'][np.argmax(proba.reshape(-1, value.shape[1]), axis=1)]
+
+
+def build_table(model, scaler, path=TABLE_PATH, ages=TABLE_AGES, chunk_size=1 << 16, progress=None):
+    """Evaluate the model on every clinical-only input and write the table.
+
+    ``path`` receives a ``(groups, combinations)`` uint8 array of class ids;
+    a sidecar ``.ages.npy`` maps each age to its row (-1 if not tabulated)
+    and ``.meta.json`` holds the model fingerprint.
+    """
+    ages = np.asarray(list(ages), dtype=np.int64)
+    if ages.size == 0 or ages.min() < 0:
+        raise ValueError("ages must be non-empty and non-negative")
+    group_of_age, representatives = age_groups(model, scaler, ages)
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8,
+                                      shape=(len(representatives), n_combinations))
+    forest = _fused_forest(model, scaler)
+    rows = np.zeros((chunk_size, len(feature_order)))
+    age_column = feature_order.index('age')
+    for g, age in enumerate(representatives):
+        if forest is not None:
+            table[g] = _forest_row(forest, age)
+            if progress is not None:
+                progress(g + 1, len(representatives))
+            continue
+        for start in range(0, n_combinations, chunk_size):
+            stop = min(start + chunk_size, n_combinations)
+            X = rows[:stop - start]
+            X[:, _clinical_columns] = _decode(np.arange(start, stop))
+            X[:, age_column] = age
+            table[g, start:stop] = predict_matrix(model, scaler, X)
+        if progress is not None:
+            progress(g + 1, len(representatives))
+    table.flush()
+    del table
+
+    age_rows = np.full(int(ages.max()) + 1, -1, dtype=np.int16)
+    age_rows[ages] = group_of_age
+    np.save(_ages_path(path), age_rows)
+    with open(_meta_path(path), 'w') as f:
+        json.dump({'fingerprint': model_fingerprint(model, scaler)}, f)
+
+
+class ClinicalTable:
+    """Read-only view of a table written by ``build_table``."""
+
+    def __init__(self, table, age_rows):
+        self.table = table
+        self.age_rows = age_rows
+
+    @classmethod
+    def load(cls, path=TABLE_PATH, fingerprint=None):
+        """Open a table; raises ValueError if it was built for a model other than ``fingerprint``."""
+        if fingerprint is not None:
+            try:
+                with open(_meta_path(path)) as f:
+                    built_for = json.load(f).get('fingerprint')
+            except FileNotFoundError:
+                built_for = None
+            if built_for != fingerprint:
+                raise ValueError(f"{path} was built for a different model; rebuild it with clinical_table.py")
+        return cls(np.load(path, mmap_mode='r'), np.load(_ages_path(path)))
+
+    def lookup(self, answers, age):
+        """Class id for a clinical-only assessment, or None if the table can't answer it.
+
+        ``answers`` may include lab features; any non-zero lab answer falls
+        outside the table.
+        """
+        for f, value in answers.items():
+            if f in option_counts and f not in clinical_features and value != 0:
+                return None
+        if age != int(age) or not 0 <= age < len(self.age_rows):
+            return None
+        row = self.age_rows[int(age)]
+        if row < 0:
+            return None
+        value = int(self.table[row, combination_index(answers)])
+        return value or None
+
+
+def _parse_ages(text):
+    low, _, high = text.partition('-')
+    return range(int(low), int(high or low) + 1)
+
+
+def main(argv=None):
+    from inference import MODEL_PATH, SCALER_PATH, load_artifacts
+
+    parser = argparse.ArgumentParser(description="Precompute predictions for clinical-only assessments.")
+    parser.add_argument('--model', default=MODEL_PATH, help="path to the pickled model or a fastpath .npz export")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="path to the pickled scaler")
+    parser.add_argument('--out', default=TABLE_PATH, help="output .npy path (default: %(default)s)")
+    parser.add_argument('--ages', type=_parse_ages, default=TABLE_AGES,
+                        help=f"age range to tabulate, e.g. {AGE_MIN}-{AGE_MAX} "
+                             f"(default: {TABLE_AGES.start}-{TABLE_AGES.stop - 1})")
+    parser.add_argument('--chunk-size', type=int, default=1 << 16, help="rows predicted per call")
+    args = parser.parse_args(argv)
+
+    model, scaler = load_artifacts(args.model, args.scaler)
+    groups, _ = age_groups(model, scaler, args.ages)
+    n_groups = int(groups.max()) + 1
+    print(f"{len(args.ages)} ages in {n_groups} groups x {n_combinations} answer combinations "
+          f"({n_groups * n_combinations / 2 ** 20:.0f} MiB)")
+    started = time.perf_counter()
+
+    def progress(done, total):
+        print(f"  age group {done}/{total} ({time.perf_counter() - started:.0f}s)")
+
+    build_table(model, scaler, args.out, args.ages, args.chunk_size, progress)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
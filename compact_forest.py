@@ -0,0 +1,246 @@
+"""Quantized, pruned random forest export for low-memory kiosks.
+
+Every questionnaire answer is an integer 0-3 and age a whole number of
+years, so once the scaler is fused into a forest (see ``fastpath``) each
+split is ``x <= k`` for a small integer ``k``. ``compact_arrays`` rebuilds
+each tree on that integer grid:
+
+* splits that cannot go both ways given the answers' ranges and the splits
+  above them are removed, keeping only the reachable child;
+* with ``prune``, sibling leaves voting for the same class are merged into
+  one leaf (their class fractions averaged by training sample weight), which
+  repeats up the tree, so subtrees that always vote alike become one leaf;
+* ``n_trees`` keeps only the first trees, an unbiased subsample of a forest.
+
+Nodes are stored as int8 features and thresholds, int16 child links
+(int32 for very large forests) and uint8 class fractions, in a fastpath
+``.npz`` with format version 3 that ``FastPredictor.load`` and therefore
+``inference.load_artifacts`` read as a ``CompactForest``.
+
+Usage:
+    python compact_forest.py --model skin_disease_model.pkl --scaler scaler.pkl --out skin_disease_model.kiosk.npz
+    python compact_forest.py --trees 40 --data dermatology.data   # report on the notebook's test split
+"""
+
+import argparse
+import datetime
+import os
+import time
+
+import numpy as np
+
+from fastpath import FastPredictor, model_arrays
+from features import feature_order, option_counts, random_answers
+
+FORMAT_VERSION = 3
+COMPACT_MODEL_PATH = 'skin_disease_model.kiosk.npz'
+# Largest value an int8 input can hold; ages are clipped to it
+_INT8_MAX = np.iinfo(np.int8).max
+# Leaves compare every input against this and so always step onto themselves
+_LEAF_THRESHOLD = _INT8_MAX
+_VALUE_SCALE = 255
+
+domain_max = np.array([_INT8_MAX if f == 'age' else option_counts[f] - 1 for f in feature_order])
+
+
+def _compact_tree(a, weights, root, prune):
+    """One fused tree rebuilt on the integer grid; returns local node lists."""
+    feature, threshold, left, right, value = [], [], [], [], []
+
+    def leaf(v):
+        node = len(feature)
+        feature.append(0)
+        threshold.append(_LEAF_THRESHOLD)
+        left.append(node)
+        right.append(node)
+        value.append(v)
+        return node
+
+    def build(node, lo, hi):
+        """Emit ``node``'s subtree in preorder; returns (id, leaf value or None, weight)."""
+        if a['left'][node] == node:
+            return leaf(a['value'][node]), a['value'][node], weights[node]
+        f = int(a['feature'][node])
+        # Fused thresholds are k + 0.5, so "x <= threshold" is "x <= k" on integers
+        k = int(np.floor(a['threshold'][node]))
+        if k >= hi[f]:
+            return build(a['left'][node], lo, hi)
+        if k < lo[f]:
+            return build(a['right'][node], lo, hi)
+        slot = len(feature)
+        feature.append(f)
+        threshold.append(k)
+        left.append(-1)
+        right.append(-1)
+        value.append(np.zeros(a['value'].shape[1]))
+        left_hi, right_lo = hi.copy(), lo.copy()
+        left_hi[f], right_lo[f] = k, k + 1
+        left_id, left_value, left_weight = build(a['left'][node], lo, left_hi)
+        right_id, right_value, right_weight = build(a['right'][node], right_lo, hi)
+        weight = left_weight + right_weight
+        if (prune and left_value is not None and right_value is not None
+                and np.argmax(left_value) == np.argmax(right_value)):
+            for column in (feature, threshold, left, right, value):
+                del column[slot:]
+            merged = (left_value * left_weight + right_value * right_weight) / weight
+            return leaf(merged), merged, weight
+        left[slot], right[slot] = left_id, right_id
+        return slot, None, weight
+
+    build(root, np.zeros(len(feature_order), dtype=np.int64), domain_max.copy())
+    return feature, threshold, left, right, value
+
+
+def _depth(left, right, root):
+    depth, frontier = 0, [root]
+    while True:
+        frontier = [child for node in frontier if left[node] != node for child in (left[node], right[node])]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def compact_arrays(model, scaler, n_trees=None, prune=True):
+    """Quantized array form of a fitted RandomForestClassifier and its scaler."""
+    if type(model).__name__ != 'RandomForestClassifier':
+        raise ValueError(f"Only random forests can be compacted, got {type(model).__name__}")
+    a = model_arrays(model, scaler, fuse=True)
+    estimators = model.estimators_[:n_trees] if n_trees else model.estimators_
+    weights = np.concatenate([e.tree_.weighted_n_node_samples for e in model.estimators_])
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    depth = 0
+    for root in a['roots'][:len(estimators)].tolist():
+        f, t, l, r, v = _compact_tree(a, weights, root, prune)
+        depth = max(depth, _depth(l, r, 0))
+        offset = len(feature)
+        roots.append(offset)
+        feature += f
+        threshold += t
+        left += [child + offset for child in l]
+        right += [child + offset for child in r]
+        value += v
+    index = np.int16 if len(feature) <= np.iinfo(np.int16).max else np.int32
+    value = np.rint(np.asarray(value) * _VALUE_SCALE)
+    return {
+        'kind': np.asarray('forest'),
+        'format_version': np.asarray(FORMAT_VERSION),
+        'created': np.asarray(datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')),
+        'fused': np.asarray(True),
+        'quantized': np.asarray(True),
+        'classes': np.asarray(model.classes_, dtype=np.int8),
+        'domain_max': domain_max.astype(np.int8),
+        'feature': np.asarray(feature, dtype=np.int8),
+        'threshold': np.asarray(threshold, dtype=np.int8),
+        'left': np.asarray(left, dtype=index),
+        'right': np.asarray(right, dtype=index),
+        'value': value.astype(np.uint8),
+        'roots': np.asarray(roots, dtype=index),
+        'depth': np.asarray(depth, dtype=np.int8),
+    }
+
+
+def export_compact(model, scaler, path=COMPACT_MODEL_PATH, n_trees=None, prune=True):
+    np.savez(path, **compact_arrays(model, scaler, n_trees, prune))
+
+
+class CompactForest(FastPredictor):
+    """Predict with a quantized forest export; drop-in for ``FastPredictor``."""
+
+    quantized = True
+
+    def __init__(self, arrays):
+        self.kind = 'forest'
+        self.fused = True
+        self.classes_ = np.asarray(arrays['classes'], dtype=np.int64)
+        self.mean = None
+        self.scale = None
+        self.arrays = arrays
+
+    def _forest_proba(self, X):
+        a = self.arrays
+        # Inputs on the integer grid the thresholds were quantized to
+        X = np.clip(np.rint(X), 0, a['domain_max']).astype(np.int16)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(a['roots'], (X.shape[0], a['roots'].size)).copy()
+        for _ in range(int(a['depth'])):
+            go_left = X[rows, a['feature'][node]] <= a['threshold'][node]
+            node = np.where(go_left, a['left'][node], a['right'][node])
+        proba = a['value'][node].sum(axis=1, dtype=np.float64)
+        proba /= _VALUE_SCALE * a['roots'].size
+        return proba
+
+    def expanded_arrays(self):
+        """The float fused-forest arrays ``whatif.IncrementalScorer`` works on."""
+        a = self.arrays
+        leaf = a['left'] == np.arange(a['left'].size)
+        return {
+            'kind': np.asarray('forest'),
+            'fused': np.asarray(True),
+            'classes': self.classes_,
+            'left': a['left'].astype(np.int64),
+            'right': a['right'].astype(np.int64),
+            'feature': a['feature'].astype(np.int32),
+            'threshold': np.where(leaf, np.inf, a['threshold'] + 0.5),
+            'value': a['value'] / float(_VALUE_SCALE),
+            'roots': a['roots'].astype(np.int64),
+            'depth': np.asarray(int(a['depth'])),
+        }
+
+
+def _timed_load(load, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    import joblib
+
+    from benchmark import single_row_latency
+    from inference import MODEL_PATH, SCALER_PATH
+
+    parser = argparse.ArgumentParser(description="Export the forest as a quantized, pruned kiosk model.")
+    parser.add_argument('--model', default=MODEL_PATH, help="path to the pickled RandomForestClassifier")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="path to the pickled scaler")
+    parser.add_argument('--out', default=COMPACT_MODEL_PATH, help="output .npz path (default: %(default)s)")
+    parser.add_argument('--trees', type=int, help="keep only the first N trees (default: all)")
+    parser.add_argument('--no-prune', action='store_true', help="don't merge leaves that vote for the same class")
+    parser.add_argument('--check-rows', type=int, default=10000,
+                        help="random questionnaire vectors compared against the full model (default: %(default)s)")
+    parser.add_argument('--data', help="dermatology.data path or URL (default: cached copy in data/)")
+    args = parser.parse_args(argv)
+
+    model, scaler = joblib.load(args.model), joblib.load(args.scaler)
+    export_compact(model, scaler, args.out, args.trees, not args.no_prune)
+    compact = FastPredictor.load(args.out)
+    a = compact.arrays
+    print(f"Exported {a['roots'].size} trees, {a['left'].size} nodes (depth {int(a['depth'])}) to {args.out}")
+
+    full_bytes = os.path.getsize(args.model) + os.path.getsize(args.scaler)
+    print(f"  size:      {full_bytes / 1024:.0f} KiB -> {os.path.getsize(args.out) / 1024:.0f} KiB")
+    full_load = _timed_load(lambda: (joblib.load(args.model), joblib.load(args.scaler)))
+    compact_load = _timed_load(lambda: FastPredictor.load(args.out))
+    print(f"  load:      {full_load * 1000:.1f} ms -> {compact_load * 1000:.1f} ms")
+    X = random_answers(args.check_rows)
+    full_latency = single_row_latency(model, scaler, X[:1000, None, :])
+    compact_latency = single_row_latency(compact, None, X[:1000, None, :])
+    print(f"  latency:   p50 {full_latency['p50_ms']:.3f} ms -> {compact_latency['p50_ms']:.3f} ms, "
+          f"p99 {full_latency['p99_ms']:.3f} ms -> {compact_latency['p99_ms']:.3f} ms")
+    agreement = np.mean(compact.predict(X) == model.predict(scaler.transform(X)))
+    print(f"  random vectors: {agreement:.2%} agreement on {args.check_rows} rows")
+
+    from dataset import load_frame, train_test
+
+    _, x_test, _, y_test = train_test(load_frame(args.data))
+    full_accuracy = np.mean(model.predict(scaler.transform(x_test.values)) == y_test.to_numpy())
+    compact_accuracy = np.mean(compact.predict(x_test.values) == y_test.to_numpy())
+    print(f"  UCI test split accuracy: {full_accuracy:.4f} -> {compact_accuracy:.4f} "
+          f"({(compact_accuracy - full_accuracy) * 100:+.2f} points)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+"""Loading and splitting the UCI dermatology dataset the way ``SDP.ipynb`` does.
+
+``ingest`` downloads (or reads a local mirror of) ``dermatology.data`` once,
+names its columns in the file's own order (``uci_columns``, age last),
+validates them, reorders them into ``columns``, drops incomplete rows and stores
+the result as compact int8 ``.npy`` arrays plus a small JSON manifest under
+``data/``. Later loads memory-map those arrays, so training runs and
+benchmarks need neither network access nor another cleaning pass.
+
+Usage:
+    python dataset.py                          # ingest from the UCI URL
+    python dataset.py --source dermatology.data
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from features import columns, feature_order, option_counts, uci_columns
+
+UCI_URL = "https://archive.ics.uci.edu/ml/machine-learning-databases/dermatology/dermatology.data"
+DATA_DIR = 'data'
+FEATURES_FILE = 'dermatology_features.npy'
+LABELS_FILE = 'dermatology_labels.npy'
+MANIFEST_FILE = 'dermatology.json'
+
+N_CLASSES = 6
+
+
+def _read_source(source):
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source) as response:
+            return response.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def clean(raw):
+    """Parse raw ``dermatology.data`` bytes; returns (frame, dropped_row_count)."""
+    df = pd.read_csv(io.BytesIO(raw), names=uci_columns, na_values='?')[columns]
+    validate(df)
+    complete = df.dropna()
+    return complete, len(df) - len(complete)
+
+
+def validate(df):
+    """Raise ValueError unless ``df`` matches the 34-feature + class schema."""
+    if list(df.columns) != columns:
+        raise ValueError(f"Expected {len(columns)} columns {columns}, got {list(df.columns)}")
+    problems = []
+    for name in columns:
+        values = df[name].dropna()
+        if not np.all(np.mod(values, 1) == 0):
+            problems.append(f"'{name}' has non-integer values")
+            continue
+        if name == 'class':
+            low, high = 1, N_CLASSES
+        elif name == 'age':
+            low, high = 0, np.iinfo(np.int8).max
+        else:
+            low, high = 0, option_counts[name] - 1
+        if len(values) and (values.min() < low or values.max() > high):
+            problems.append(f"'{name}' outside {low}..{high}")
+    if df['class'].isna().any():
+        problems.append("'class' has missing values")
+    if problems:
+        raise ValueError("Invalid dermatology data: " + "; ".join(problems))
+
+
+def ingest(source=UCI_URL, data_dir=DATA_DIR):
+    """Fetch, validate and store the dataset as int8 arrays; returns the manifest."""
+    raw = _read_source(source)
+    df, dropped = clean(raw)
+    os.makedirs(data_dir, exist_ok=True)
+    np.save(os.path.join(data_dir, FEATURES_FILE), df[feature_order].to_numpy(dtype=np.int8))
+    np.save(os.path.join(data_dir, LABELS_FILE), df['class'].to_numpy(dtype=np.int8))
+    manifest = {
+        'source': source,
+        'sha256': hashlib.sha256(raw).hexdigest(),
+        'rows': len(df),
+        'dropped_incomplete_rows': dropped,
+        'source_columns': uci_columns,
+        'columns': columns,
+    }
+    with open(os.path.join(data_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _current(data_dir):
+    """Whether the cache was ingested with today's column layout (older ones misplaced age)."""
+    try:
+        with open(os.path.join(data_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return manifest.get('source_columns') == uci_columns and manifest.get('columns') == columns
+
+
+def load_arrays(data_dir=DATA_DIR, source=UCI_URL):
+    """Memory-mapped int8 (features, labels), ingesting ``source`` on first use."""
+    features = os.path.join(data_dir, FEATURES_FILE)
+    labels = os.path.join(data_dir, LABELS_FILE)
+    if not (os.path.exists(features) and os.path.exists(labels) and _current(data_dir)):
+        ingest(source, data_dir)
+    return np.load(features, mmap_mode='r'), np.load(labels, mmap_mode='r')
+
+
+def load_frame(source=None, data_dir=DATA_DIR):
+    """The cleaned dataset as a DataFrame with ``columns``.
+
+    With no ``source`` the cached arrays are used (ingesting from UCI the
+    first time); an explicit path or URL is read and cleaned directly.
+    """
+    if source is not None:
+        return clean(_read_source(source))[0]
+    X, y = load_arrays(data_dir)
+    df = pd.DataFrame(np.asarray(X), columns=feature_order)
+    df['class'] = np.asarray(y)
+    return df
+
+
+def train_test(df, test_size=0.2, random_state=42):
+    """Stratified split used by the notebook: (x_train, x_test, y_train, y_test)."""
+    from sklearn.model_selection import train_test_split
+
+    x = df.drop('class', axis=1)
+    y = df['class']
+    return train_test_split(x, y, test_size=test_size, random_state=random_state, stratify=y)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest the UCI dermatology dataset into a compact local cache.")
+    parser.add_argument('--source', default=UCI_URL, help="dermatology.data path or URL (default: UCI)")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="cache directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    manifest = ingest(args.source, args.data_dir)
+    print(f"Stored {manifest['rows']} rows ({manifest['dropped_incomplete_rows']} incomplete rows dropped) "
+          f"in {args.data_dir}/")
+
+
+if __name__ == '__main__':
+    main()
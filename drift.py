@@ -0,0 +1,247 @@
+"""Streaming drift monitor for live answers and predictions.
+
+Every questionnaire answer is already a small ordinal, so its histogram is
+just a count per option; age is counted in decades. ``DriftMonitor`` keeps
+one fixed-size count matrix (34 features x 9 bins) plus six predicted-class
+counts, updated with one ``bincount`` per batch, so memory is constant and
+no raw records are kept. Counts decay exponentially with a half-life of
+``half_life`` assessments, so the histograms describe recent traffic and an
+alert clears once the inputs return to normal. Only answers the user
+actually gave are counted: questions skipped in adaptive mode and lab
+results never entered stay out of the histograms instead of piling up as 0.
+
+``check`` compares the live histograms with the training distribution saved
+in ``drift_reference.json`` next to ``scaler.pkl`` using the population
+stability index (PSI) and the largest gap between the cumulative
+distributions (a KS-style statistic for ordinal scales), and logs an alert
+when a feature's or the predictions' PSI crosses ``threshold``.
+
+Usage:
+    python drift.py --data dermatology.data          # write the training reference
+    python drift.py --log assessment_log             # replay logged assessments against it
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import threading
+
+import numpy as np
+
+import metrics
+from features import feature_order, option_counts
+from inference import as_matrix
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_PATH = 'drift_reference.json'
+# Age bins: under 10, 10-19, ..., 70-79, 80 and over
+AGE_EDGES = np.arange(10, 90, 10)
+# Rule-of-thumb PSI levels: under 0.1 stable, 0.1-0.25 moderate, over 0.25 significant shift
+PSI_THRESHOLD = 0.25
+# Assessments after which a count has lost half its weight
+HALF_LIFE = 1000
+N_CLASSES = 6
+
+_n_bins = np.array([len(AGE_EDGES) + 1 if f == 'age' else option_counts[f] for f in feature_order])
+MAX_BINS = int(_n_bins.max())
+_valid = np.arange(MAX_BINS) < _n_bins[:, None]
+_age_column = feature_order.index('age')
+_offsets = np.arange(len(feature_order)) * MAX_BINS
+
+
+def histogram(rows, answered=None):
+    """(34, MAX_BINS) counts of ``rows`` (raw answers in ``feature_order``) per feature and bin.
+
+    ``answered`` is an optional boolean mask of the same shape as ``rows``;
+    only the answers it marks are counted.
+    """
+    X = as_matrix(rows)
+    bins = np.clip(X, 0, _n_bins - 1).astype(np.int64)
+    bins[:, _age_column] = np.searchsorted(AGE_EDGES, X[:, _age_column], side='right')
+    weights = None if answered is None else np.asarray(answered, dtype=np.float64).reshape(X.shape).ravel()
+    counts = np.bincount((bins + _offsets).ravel(), weights, minlength=len(feature_order) * MAX_BINS)
+    return counts.reshape(len(feature_order), MAX_BINS)
+
+
+def class_counts(classes):
+    """Counts of class ids 1-6."""
+    return np.bincount(np.asarray(classes, dtype=np.int64) - 1, minlength=N_CLASSES)[:N_CLASSES]
+
+
+def _distribution(counts, valid):
+    # Half a count per bin keeps empty bins from making the PSI infinite
+    smoothed = np.where(valid, counts + 0.5, 0.0)
+    return smoothed / smoothed.sum(axis=-1, keepdims=True)
+
+
+def psi(expected, actual, valid=None):
+    """Population stability index between two count arrays, along the last axis."""
+    expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+    valid = np.ones(expected.shape, dtype=bool) if valid is None else valid
+    p, q = _distribution(expected, valid), _distribution(actual, valid)
+    ratio = np.log(np.where(valid, q, 1.0) / np.where(valid, p, 1.0))
+    return ((q - p) * ratio).sum(axis=-1)
+
+
+def cdf_gap(expected, actual, valid=None):
+    """Largest gap between two ordinal distributions' CDFs (KS statistic), along the last axis."""
+    expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+    valid = np.ones(expected.shape, dtype=bool) if valid is None else valid
+    p, q = _distribution(expected, valid), _distribution(actual, valid)
+    return np.abs(np.cumsum(q, axis=-1) - np.cumsum(p, axis=-1)).max(axis=-1)
+
+
+def reference_profile(X, y):
+    """Training distribution of raw features ``X`` and labels ``y``, ready for ``save_reference``."""
+    return {
+        'feature_order': feature_order,
+        'age_edges': AGE_EDGES.tolist(),
+        'rows': int(len(X)),
+        'counts': histogram(X).tolist(),
+        'class_counts': class_counts(y).tolist(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def save_reference(profile, path=REFERENCE_PATH):
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+
+def load_reference(path=REFERENCE_PATH):
+    """The saved training profile; raises ValueError if it was built for other features or bins."""
+    with open(path) as f:
+        profile = json.load(f)
+    if profile['feature_order'] != feature_order or profile['age_edges'] != AGE_EDGES.tolist():
+        raise ValueError(f"{path} was built for a different feature layout; rebuild it with drift.py")
+    return profile
+
+
+class DriftMonitor:
+    """Decaying feature and prediction histograms compared against a training profile.
+
+    ``update`` checks for drift every ``check_every`` rows once
+    ``min_samples`` rows have been seen, and logs an alert (and counts a
+    ``drift_alert`` metric) when a feature newly crosses ``threshold``. A
+    feature is only judged once its decayed count reaches ``min_samples``.
+    ``half_life=None`` keeps every count at full weight (used for offline replays).
+    """
+
+    def __init__(self, reference, threshold=PSI_THRESHOLD, min_samples=200, check_every=100, half_life=HALF_LIFE):
+        self.reference = np.asarray(reference['counts'], dtype=np.float64)
+        self.reference_classes = np.asarray(reference['class_counts'], dtype=np.float64)
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.check_every = check_every
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self.counts = np.zeros((len(feature_order), MAX_BINS))
+        self.predicted = np.zeros(N_CLASSES)
+        self.rows = 0
+        self._since_check = 0
+        self.drifted = set()
+        self.alerts = 0
+
+    @classmethod
+    def load(cls, path=REFERENCE_PATH, **kwargs):
+        return cls(load_reference(path), **kwargs)
+
+    def _decay(self, n):
+        return 1.0 if self.half_life is None else 0.5 ** (n / self.half_life)
+
+    def update(self, rows, predictions=None, answered=None):
+        """Add a batch of raw rows and, optionally, their predicted class ids.
+
+        ``answered`` masks the answers the user actually gave (see ``histogram``);
+        by default every answer counts.
+        """
+        X = as_matrix(rows)
+        counts = histogram(X, answered)
+        with self._lock:
+            n = len(X)
+            self.counts *= self._decay(n)
+            self.counts += counts
+            if predictions is not None:
+                predicted = class_counts(predictions)
+                self.predicted *= self._decay(int(predicted.sum()))
+                self.predicted += predicted
+            self.rows += n
+            self._since_check += n
+            due = self.rows >= self.min_samples and self._since_check >= self.check_every
+            if due:
+                self._since_check = 0
+        if due:
+            self.check()
+
+    def check(self):
+        """Drift statistics for everything seen so far; alerts on newly drifted features."""
+        with self._lock:
+            counts, predicted, rows = self.counts.copy(), self.predicted.copy(), self.rows
+        feature_psi = psi(self.reference, counts, _valid)
+        feature_gap = cdf_gap(self.reference, counts, _valid)
+        weight = counts.sum(axis=1)
+        report = {
+            'rows': rows,
+            'features': {f: {'psi': float(p), 'ks': float(g), 'weight': float(w)}
+                         for f, p, g, w in zip(feature_order, feature_psi, feature_gap, weight)},
+            'predictions_psi': float(psi(self.reference_classes, predicted)) if predicted.any() else None,
+        }
+        judged = weight >= max(self.min_samples, 1)
+        scores = dict(zip(np.array(feature_order)[judged].tolist(), feature_psi[judged].tolist()))
+        if report['predictions_psi'] is not None and predicted.sum() >= self.min_samples:
+            scores['predicted_class'] = report['predictions_psi']
+        drifted = {name for name, score in scores.items() if score > self.threshold}
+        report['drifted'] = sorted(drifted)
+        if rows < self.min_samples:
+            return report
+        metrics.gauge('drift_psi_max', max(scores.values(), default=0.0))
+        if report['predictions_psi'] is not None:
+            metrics.gauge('drift_predictions_psi', report['predictions_psi'])
+        with self._lock:
+            new = drifted - self.drifted
+            self.drifted = drifted
+            self.alerts += len(new)
+        if new:
+            metrics.count('drift_alert', len(new))
+            logger.warning("Input drift over %d rows (PSI > %.2f): %s", rows, self.threshold,
+                           ', '.join(f"{name} {scores[name]:.2f}" for name in sorted(new)))
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the drift reference or check logged assessments against it.")
+    parser.add_argument('--data', help="dermatology.data path or URL for the reference (default: cached copy in data/)")
+    parser.add_argument('--reference', default=REFERENCE_PATH, help="reference JSON path (default: %(default)s)")
+    parser.add_argument('--log', help="assessment log directory to check against the reference instead")
+    parser.add_argument('--threshold', type=float, default=PSI_THRESHOLD, help="PSI alert level (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.log is None:
+        from dataset import load_frame, train_test
+
+        x_train, _, y_train, _ = train_test(load_frame(args.data))
+        save_reference(reference_profile(x_train.values, y_train.to_numpy()), args.reference)
+        print(f"Wrote {args.reference} from {len(x_train)} training rows")
+        return 0
+
+    from audit_log import load_log
+
+    log = load_log(args.log)
+    monitor = DriftMonitor.load(args.reference, threshold=args.threshold, min_samples=0, half_life=None)
+    if len(log):
+        monitor.update(log[feature_order].to_numpy(), log['class'].to_numpy())
+    report = monitor.check()
+    print(f"{report['rows']} logged assessments")
+    for f, stats in sorted(report['features'].items(), key=lambda item: -item[1]['psi']):
+        flag = '  DRIFT' if f in report['drifted'] else ''
+        print(f"  {f:<36} PSI {stats['psi']:.3f}  KS {stats['ks']:.3f}{flag}")
+    if report['predictions_psi'] is not None:
+        flag = '  DRIFT' if 'predicted_class' in report['drifted'] else ''
+        print(f"  {'predicted class':<36} PSI {report['predictions_psi']:.3f}{flag}")
+    return 1 if report['drifted'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
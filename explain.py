@@ -0,0 +1,100 @@
+"""Per-prediction answer attributions from one batched what-if pass.
+
+For each row, every questionnaire answer is swapped in turn for each of its
+other options (and age for each age in ``AGE_GRID``), and all of those
+variants are scored in a single ``predict_proba_matrix`` call. The grid has
+the same layout for every row, so a batch of rows is one ``(n * variants,
+34)`` matrix instead of hundreds of separate ``predict`` calls. From it:
+
+* ``contribution``: how much the probability of the target class drops when
+  the answer is reset to option 0 ("none"/"not tested"), i.e. how much this
+  answer supports the result. Age has no neutral value and gets 0.
+* ``sensitivity``: the largest change in that probability any other option
+  of the answer would make.
+* ``flips``: whether some other option of the answer would change the top
+  class.
+
+Usage:
+    result = explain_matrix(model, scaler, rows, temperature)
+    for item in top_answers(result, 0, answers, k=5):
+        ...
+"""
+
+import numpy as np
+
+import metrics
+from features import AGE_MAX, feature_order, option_counts, questions
+from inference import as_matrix, predict_proba_matrix
+
+# Ages tried when measuring how much the prediction depends on age
+AGE_GRID = tuple(range(5, AGE_MAX + 1, 10))
+
+_question_of = {q['feature']: q for q in questions['clinical'] + questions['histopathological']}
+_grid_values = [list(AGE_GRID) if f == 'age' else list(range(option_counts[f])) for f in feature_order]
+grid_feature = np.repeat(np.arange(len(feature_order)), [len(v) for v in _grid_values])
+grid_value = np.concatenate(_grid_values).astype(np.float64)
+_grid_starts = np.concatenate([[0], np.cumsum([len(v) for v in _grid_values])[:-1]])
+# Grid position of option 0 for each questionnaire feature (-1 for age)
+_zero_index = np.array([-1 if f == 'age' else s for f, s in zip(feature_order, _grid_starts)])
+
+
+def explain_matrix(model, scaler, rows, temperature=1.0, target=None):
+    """Attributions for every row and feature; returns a dict of arrays.
+
+    ``target`` holds the class id (1-6) to explain for each row and defaults
+    to the most likely class. The result has ``proba`` (n, 6), ``target``
+    (n,), ``contribution``, ``sensitivity`` and ``flips`` (n, 34, in
+    ``feature_order``), and the ``what_if`` probabilities (n, variants, 6)
+    for ``grid_feature``/``grid_value``.
+    """
+    started = metrics.clock()
+    X = as_matrix(rows)
+    n, m = len(X), len(grid_value)
+    variants = np.repeat(X[:, None, :], m, axis=1)
+    variants[:, np.arange(m), grid_feature] = grid_value
+    proba = predict_proba_matrix(model, scaler, np.concatenate([X, variants.reshape(-1, X.shape[1])]), temperature)
+    base, what_if = proba[:n], proba[n:].reshape(n, m, -1)
+
+    top = np.argmax(base, axis=1)
+    target = top + 1 if target is None else np.broadcast_to(np.asarray(target, dtype=np.int64), (n,))
+    rows_idx = np.arange(n)
+    p_target = base[rows_idx, target - 1]
+    p_what_if = what_if[rows_idx, :, target - 1]
+
+    contribution = np.zeros_like(X)
+    answered = _zero_index >= 0
+    contribution[:, answered] = p_target[:, None] - p_what_if[:, _zero_index[answered]]
+    sensitivity = np.maximum.reduceat(np.abs(p_what_if - p_target[:, None]), _grid_starts, axis=1)
+    flips = np.logical_or.reduceat(np.argmax(what_if, axis=2) != (target - 1)[:, None], _grid_starts, axis=1)
+    metrics.observe('explain', started)
+    return {
+        'proba': base,
+        'target': target,
+        'contribution': contribution,
+        'sensitivity': sensitivity,
+        'flips': flips,
+        'what_if': what_if,
+    }
+
+
+def top_answers(result, i, answers, k=5):
+    """The ``k`` answers of row ``i`` that most support its target class, strongest first.
+
+    Each item has the feature, question, chosen option text and its
+    contribution; answers that push away from the target are left out.
+    """
+    contribution = result['contribution'][i]
+    items = []
+    for f in np.argsort(-contribution, kind='stable')[:k].tolist():
+        if contribution[f] <= 0:
+            break
+        feature = feature_order[f]
+        q = _question_of[feature]
+        items.append({
+            'feature': feature,
+            'question': q['question'],
+            'answer': q['options'][int(answers.get(feature, 0))],
+            'contribution': float(contribution[f]),
+            'flips': bool(result['flips'][i, f]),
+        })
+    return items
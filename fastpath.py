@@ -0,0 +1,363 @@
+"""Array-backed fast-path predictor for the trained model and scaler.
+
+``export_model`` flattens a fitted RandomForestClassifier or RBF SVC together
+with its StandardScaler into plain NumPy arrays saved as an ``.npz`` file.
+``FastPredictor`` loads that file and predicts with vectorized NumPy only, so
+serving does not need to import scikit-learn:
+
+* Random forest: all trees are concatenated into one node table and every
+  (row, tree) pair is walked one level per step; leaf class fractions are
+  accumulated in tree order exactly as ``RandomForestClassifier.predict_proba``.
+* SVM: one RBF kernel matrix against all support vectors is multiplied by a
+  dense one-vs-one coefficient matrix, followed by libsvm's pairwise vote.
+
+By default the scaler is fused into the model: split thresholds are moved
+into raw feature space and support vectors are pre-scaled, so a prediction
+is one pass over the raw input with no separate transform. Fused forest
+thresholds sit on the integer grid every questionnaire answer (and age) lies
+on; use ``fuse=False`` for models fed non-integer features.
+
+An output path without the ``.npz`` suffix is written as a directory of
+plain ``.npy`` files instead. Those are loaded with ``mmap_mode='r'``, so
+every app process on a host shares one page-cache copy of the model.
+
+Usage:
+    python fastpath.py --model skin_disease_model.pkl --scaler scaler.pkl --out skin_disease_model.npz
+    python fastpath.py --out skin_disease_model   # memory-mappable directory
+    python fastpath.py --data dermatology.data   # also compare on the UCI test split
+"""
+
+import argparse
+import datetime
+import os
+import shutil
+
+import numpy as np
+
+from features import feature_order, random_answers
+from inference import FAST_MODEL_PATH
+
+FORMAT_VERSION = 2
+# Version 1 files predate scaler fusion and are always unfused; version 3 is
+# the quantized forest written by compact_forest.py
+SUPPORTED_VERSIONS = (1, 2, 3)
+
+
+def _scaler_arrays(scaler):
+    n = len(feature_order)
+    mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None and scaler.with_mean else np.zeros(n)
+    scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None and scaler.with_std else np.ones(n)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+def _forest_arrays(model):
+    left, right, feature, threshold, value = [], [], [], [], []
+    roots, offset, depth = [], 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        ids = np.arange(n)
+        is_leaf = tree.children_left == -1
+        # Leaves point at themselves so extra traversal steps are no-ops
+        left.append(np.where(is_leaf, ids, tree.children_left) + offset)
+        right.append(np.where(is_leaf, ids, tree.children_right) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        counts = tree.value[:, 0, :].astype(np.float64)
+        normalizer = counts.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(counts / normalizer)
+        roots.append(offset)
+        offset += n
+        depth = max(depth, tree.max_depth)
+    index = np.int32 if offset < 2 ** 31 else np.int64
+    return {
+        'left': np.concatenate(left).astype(index),
+        'right': np.concatenate(right).astype(index),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'value': np.concatenate(value),
+        'roots': np.asarray(roots, dtype=index),
+        'depth': np.asarray(depth),
+    }
+
+
+def _svc_arrays(model):
+    if model.kernel != 'rbf':
+        raise ValueError(f"Only the RBF kernel is supported, got '{model.kernel}'")
+    n_classes = len(model.classes_)
+    if n_classes < 3:
+        raise ValueError("Binary SVC models are not supported")
+    n_support = model.n_support_
+    starts = np.concatenate([[0], np.cumsum(n_support)[:-1]])
+    dual_coef = model.dual_coef_
+    pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+    # Column p holds libsvm's coefficients for the (i, j) decision function
+    coef = np.zeros((model.support_vectors_.shape[0], len(pairs)))
+    vote_i = np.zeros((len(pairs), n_classes))
+    vote_j = np.zeros((len(pairs), n_classes))
+    for p, (i, j) in enumerate(pairs):
+        si, sj = starts[i], starts[j]
+        coef[si:si + n_support[i], p] = dual_coef[j - 1, si:si + n_support[i]]
+        coef[sj:sj + n_support[j], p] = dual_coef[i, sj:sj + n_support[j]]
+        vote_i[p, i] = 1
+        vote_j[p, j] = 1
+    sv = np.asarray(model.support_vectors_, dtype=np.float64)
+    return {
+        'support_vectors': sv,
+        'sv_sq_norms': np.einsum('ij,ij->i', sv, sv),
+        'coef': coef,
+        'intercept': np.asarray(model.intercept_, dtype=np.float64),
+        'gamma': np.asarray(model._gamma, dtype=np.float64),
+        'vote_i': vote_i,
+        'vote_j': vote_j,
+    }
+
+
+def _fuse_forest(arrays, mean, scale):
+    # x_scaled <= t  <=>  x <= t * scale + mean (scale is always positive). Many
+    # thresholds fall exactly on an unseen integer answer, where sklearn's
+    # float32 rounding decides the branch, so each cut-off is snapped to
+    # halfway past the largest integer that the two-stage pipeline sends left.
+    feature = arrays['feature']
+    threshold = arrays['threshold']
+    split = np.isfinite(threshold)
+    m, s, t = mean[feature[split]], scale[feature[split]], threshold[split]
+    candidates = np.floor(t * s + m)[:, None] + np.arange(-2, 3)
+    goes_left = ((candidates - m[:, None]) / s[:, None]).astype(np.float32) <= t[:, None]
+    largest_left = np.where(goes_left, candidates, -np.inf).max(axis=1)
+    fused = threshold.copy()
+    fused[split] = largest_left + 0.5
+    arrays['threshold'] = fused
+
+
+def _fuse_svc(arrays, mean, scale):
+    # ||(x - m) / s - sv||^2 = sum_k w_k (x_k - sv'_k)^2 with sv' = sv * s + m, w = 1 / s^2
+    weights = 1.0 / (scale * scale)
+    sv = arrays['support_vectors'] * scale + mean
+    arrays['support_vectors'] = sv * weights
+    arrays['sv_sq_norms'] = (sv * sv) @ weights
+    arrays['feature_weights'] = weights
+
+
+def model_arrays(model, scaler, fuse=True):
+    """Return the array form of a fitted model and scaler as a dict."""
+    kind = type(model).__name__
+    if kind == 'RandomForestClassifier':
+        arrays = _forest_arrays(model)
+        kind = 'forest'
+    elif kind == 'SVC':
+        arrays = _svc_arrays(model)
+        kind = 'svc'
+    else:
+        raise ValueError(f"Unsupported model type: {kind}")
+    mean, scale = _scaler_arrays(scaler)
+    if fuse:
+        (_fuse_forest if kind == 'forest' else _fuse_svc)(arrays, mean, scale)
+    arrays.update(
+        kind=np.asarray(kind),
+        format_version=np.asarray(FORMAT_VERSION),
+        created=np.asarray(datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')),
+        fused=np.asarray(fuse),
+        classes=np.asarray(model.classes_, dtype=np.int64),
+        mean=mean,
+        scale=scale,
+    )
+    return arrays
+
+
+def export_model(model, scaler, path=FAST_MODEL_PATH, fuse=True):
+    """Write the array form of ``model`` and ``scaler`` to an ``.npz`` file,
+    or to a directory of memory-mappable ``.npy`` files if ``path`` has no
+    ``.npz`` suffix.
+
+    An existing export is replaced, not written over, so processes that
+    still have the old files memory-mapped keep reading them intact.
+    """
+    arrays = model_arrays(model, scaler, fuse)
+    if path.endswith('.npz'):
+        tmp = path[:-len('.npz')] + '.tmp.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        return
+    tmp = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + '.npy'), array)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def ovr_decision(decision, vote_i, vote_j):
+    """One-vs-rest class scores from one-vs-one decision values, as ``SVC.decision_function``.
+
+    Each class gets its one-vs-one vote count plus its summed pairwise
+    decision values squashed into (-1/3, 1/3), which breaks vote ties.
+    """
+    positive = decision >= 0
+    votes = positive @ vote_i + (~positive) @ vote_j
+    confidence = decision @ (vote_i - vote_j)
+    return votes + confidence / (3 * (np.abs(confidence) + 1))
+
+
+def fused_arrays(model, scaler=None):
+    """Fused array form of a fitted model and scaler, or of a ``FastPredictor``."""
+    if not isinstance(model, FastPredictor):
+        return model_arrays(model, scaler, fuse=True)
+    if getattr(model, 'quantized', False):
+        return model.expanded_arrays()
+    if model.fused:
+        return model.arrays
+    arrays = dict(model.arrays)
+    (_fuse_forest if model.kind == 'forest' else _fuse_svc)(arrays, model.mean, model.scale)
+    arrays['fused'] = np.asarray(True)
+    return arrays
+
+
+def pipeline_mismatches(fast, model, scaler, X):
+    """Count rows where ``fast`` disagrees with ``model.predict(scaler.transform(X))``."""
+    X = np.asarray(X, dtype=np.float64)
+    return int(np.sum(fast.predict(X) != model.predict(scaler.transform(X))))
+
+
+class FastPredictor:
+    """Predict with an exported array-backed model; no scikit-learn needed.
+
+    ``predict`` takes raw (unscaled) rows in ``feature_order``, so it stands in
+    for the scaler and the estimator together.
+    """
+
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        self.fused = bool(arrays.get('fused', False))
+        self.classes_ = arrays['classes']
+        self.mean = arrays['mean']
+        self.scale = arrays['scale']
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path=FAST_MODEL_PATH):
+        """Load an ``.npz`` export, or memory-map an exported directory."""
+        if os.path.isdir(path):
+            arrays = {name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode='r', allow_pickle=False)
+                      for name in os.listdir(path) if name.endswith('.npy')}
+        else:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        version = int(arrays['format_version'])
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported fast model format version {version}")
+        if bool(arrays.get('quantized', False)):
+            from compact_forest import CompactForest
+
+            return CompactForest(arrays)
+        return cls(arrays)
+
+    def touch(self):
+        """Read every array once so memory-mapped pages are resident."""
+        for array in self.arrays.values():
+            if array.dtype.kind in 'biuf':
+                array.sum()
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean
+        X /= self.scale
+        return X
+
+    def _forest_proba(self, X):
+        a = self.arrays
+        if not self.fused:
+            # Trees compare float32 inputs against float64 thresholds
+            X = X.astype(np.float32).astype(np.float64)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(a['roots'], (X.shape[0], a['roots'].size)).copy()
+        for _ in range(int(a['depth'])):
+            go_left = X[rows, a['feature'][node]] <= a['threshold'][node]
+            node = np.where(go_left, a['left'][node], a['right'][node])
+        # cumsum adds trees strictly in order, matching sklearn's accumulation
+        proba = a['value'][node].cumsum(axis=1)[:, -1]
+        proba /= a['roots'].size
+        return proba
+
+    def _svc_decision(self, X):
+        """libsvm's one-vs-one decision values, one column per class pair."""
+        a = self.arrays
+        if self.fused:
+            x_sq_norms = (X * X) @ a['feature_weights']
+        else:
+            x_sq_norms = np.einsum('ij,ij->i', X, X)
+        sq_dist = x_sq_norms[:, None] + a['sv_sq_norms'][None, :] - 2.0 * (X @ a['support_vectors'].T)
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        kernel = np.exp(-a['gamma'] * sq_dist)
+        return kernel @ a['coef'] + a['intercept']
+
+    def _svc_votes(self, X):
+        positive = self._svc_decision(X) > 0
+        return positive @ self.arrays['vote_i'] + (~positive) @ self.arrays['vote_j']
+
+    def _predict(self, X):
+        if self.kind == 'forest':
+            scores = self._forest_proba(X)
+        else:
+            scores = self._svc_votes(X)
+        return self.classes_[np.argmax(scores, axis=1)]
+
+    def _prepare(self, X):
+        if self.fused:
+            return np.asarray(X, dtype=np.float64)
+        return self.transform(X)
+
+    def predict(self, X):
+        """Predict class ids for raw rows in ``feature_order``."""
+        return self._predict(self._prepare(X))
+
+    def predict_proba(self, X):
+        """Forest class fractions for raw rows, as ``RandomForestClassifier.predict_proba``."""
+        if self.kind != 'forest':
+            raise AttributeError("predict_proba is only available for forest exports")
+        return self._forest_proba(self._prepare(X))
+
+    def decision_function(self, X):
+        """One-vs-rest SVC scores for raw rows, as ``SVC.decision_function``."""
+        if self.kind != 'svc':
+            raise AttributeError("decision_function is only available for SVC exports")
+        a = self.arrays
+        return ovr_decision(self._svc_decision(self._prepare(X)), a['vote_i'], a['vote_j'])
+
+
+def main(argv=None):
+    import joblib
+
+    from inference import MODEL_PATH, SCALER_PATH
+
+    parser = argparse.ArgumentParser(description="Export the trained model to the fast-path array format.")
+    parser.add_argument('--model', default=MODEL_PATH, help="path to the pickled model")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="path to the pickled scaler")
+    parser.add_argument('--out', default=FAST_MODEL_PATH, help="output .npz path")
+    parser.add_argument('--no-fuse', action='store_true', help="keep the scaler as a separate pass")
+    parser.add_argument('--check-rows', type=int, default=10000,
+                        help="random questionnaire vectors compared against the original (default: %(default)s)")
+    parser.add_argument('--data', help="dermatology.data path or URL; also compare on the notebook's test split")
+    args = parser.parse_args(argv)
+
+    model, scaler = joblib.load(args.model), joblib.load(args.scaler)
+    export_model(model, scaler, args.out, fuse=not args.no_fuse)
+    fast = FastPredictor.load(args.out)
+    mismatches = pipeline_mismatches(fast, model, scaler, random_answers(args.check_rows))
+    print(f"Exported {'fused ' if fast.fused else ''}{fast.kind} model to {args.out}")
+    print(f"  random vectors: {mismatches} mismatches on {args.check_rows} rows")
+    if args.data:
+        from dataset import load_frame, train_test
+
+        _, x_test, _, _ = train_test(load_frame(args.data))
+        split_mismatches = pipeline_mismatches(fast, model, scaler, x_test.values)
+        print(f"  UCI test split: {split_mismatches} mismatches on {len(x_test)} rows")
+        mismatches += split_mismatches
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+"""Questionnaire schema shared by the app, the scoring tools and training.
+
+``feature_order`` is the model input order: the clinical answers, age, then
+the histopathological answers. The UCI ``dermatology.data`` file itself
+stores age last (``uci_columns``); ``dataset.py`` reorders it on load.
+"""
+
+import numpy as np
+
+# Questions mapped to features
+questions = {
+    'clinical': [
+        {
+            'feature': 'erythema',
+            'question': 'Do you have redness on your skin?',
+            'options': ['No redness', 'Slight redness', 'Moderate redness', 'Severe redness']
+        },
+        {
+            'feature': 'scaling',
+            'question': 'Is your skin flaking or peeling?',
+            'options': ['No scaling', 'Mild scaling', 'Moderate scaling', 'Heavy scaling']
+        },
+        {
+            'feature': 'definite_borders',
+            'question': 'Do the affected areas have clear, well-defined edges?',
+            'options': ['No clear borders', 'Slightly defined', 'Moderately defined', 'Very clear borders']
+        },
+        {
+            'feature': 'itching',
+            'question': 'How severe is the itching?',
+            'options': ['No itching', 'Mild itching', 'Moderate itching', 'Severe itching']
+        },
+        {
+            'feature': 'koebner_phenomenon',
+            'question': 'Do new lesions appear where your skin has been injured or scratched?',
+            'options': ['Never', 'Rarely', 'Sometimes', 'Frequently']
+        },
+        {
+            'feature': 'polygonal_papules',
+            'question': 'Do you have small, flat-topped bumps with multiple sides?',
+            'options': ['None', 'Few', 'Moderate amount', 'Many']
+        },
+        {
+            'feature': 'follicular_papules',
+            'question': 'Do you have bumps around hair follicles?',
+            'options': ['None', 'Few', 'Moderate amount', 'Many']
+        },
+        {
+            'feature': 'oral_mucosal_involvement',
+            'question': 'Do you have lesions or white patches inside your mouth?',
+            'options': ['No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'knee_elbow_involvement',
+            'question': 'Are your knees or elbows affected?',
+            'options': ['Not affected', 'Slightly affected', 'Moderately affected', 'Severely affected']
+        },
+        {
+            'feature': 'scalp_involvement',
+            'question': 'Is your scalp affected?',
+            'options': ['Not affected', 'Slightly affected', 'Moderately affected', 'Severely affected']
+        },
+        {
+            'feature': 'family_history',
+            'question': 'Do family members have similar skin conditions?',
+            'options': ['No family history', 'Distant relatives', 'Close relatives', 'Multiple family members']
+        }
+    ],
+    'histopathological': [
+        {
+            'feature': 'melanin_incontinence',
+            'question': 'Has a skin biopsy shown melanin pigment leakage?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'eosinophils_infiltrate',
+            'question': 'Did the biopsy show eosinophil cells?',
+            'options': ['Not tested/No', 'Few present', 'Moderate amount', 'Many present']
+        },
+        {
+            'feature': 'PNL_infiltrate',
+            'question': 'Did the biopsy show inflammatory white blood cells?',
+            'options': ['Not tested/No', 'Mild infiltration', 'Moderate infiltration', 'Heavy infiltration']
+        },
+        {
+            'feature': 'fibrosis_papillary_dermis',
+            'question': 'Did the biopsy show tissue scarring in the dermis?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'exocytosis',
+            'question': 'Did the biopsy show immune cells in the outer skin layer?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'acanthosis',
+            'question': 'Did the biopsy show thickening of the outer skin layer?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'hyperkeratosis',
+            'question': 'Did the biopsy show thickening of the top skin layer?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'parakeratosis',
+            'question': 'Did the biopsy show abnormal cell development?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'clubbing_rete_ridges',
+            'question': 'Did the biopsy show club-shaped ridges?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'elongation_rete_ridges',
+            'question': 'Did the biopsy show elongated skin ridges?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'thinning_suprapapillary_epidermis',
+            'question': 'Did the biopsy show thinning of skin above ridges?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'spongiform_pustule',
+            'question': 'Did the biopsy show sponge-like pus formations?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'munro_microabcess',
+            'question': 'Did the biopsy show small pus collections?',
+            'options': ['Not tested/No', 'Few', 'Moderate', 'Many']
+        },
+        {
+            'feature': 'focal_hypergranulosis',
+            'question': 'Did the biopsy show localized thickening?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'disappearance_granular_layer',
+            'question': 'Did the biopsy show loss of a skin layer?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Complete']
+        },
+        {
+            'feature': 'vacuolisation_damage_basal_layer',
+            'question': 'Did the biopsy show damage to the base skin layer?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'spongiosis',
+            'question': 'Did the biopsy show fluid between skin cells?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'saw_tooth_appearance_retes',
+            'question': 'Did the biopsy show saw-tooth shaped ridges?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'follicular_horn_plug',
+            'question': 'Did the biopsy show plugged hair follicles?',
+            'options': ['Not tested/No', 'Few', 'Moderate', 'Many']
+        },
+        {
+            'feature': 'perifollicular_parakeratosis',
+            'question': 'Did the biopsy show abnormal cells around follicles?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'inflammatory_mononuclear_infiltrate',
+            'question': 'Did the biopsy show immune cell infiltration?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        },
+        {
+            'feature': 'band_like_infiltrate',
+            'question': 'Did the biopsy show a band of immune cells?',
+            'options': ['Not tested/No', 'Mild', 'Moderate', 'Severe']
+        }
+    ]
+}
+
+# Disease names
+disease_names = [
+    'Psoriasis',
+    'Seborrheic dermatitis',
+    'Lichen planus',
+    'Pityriasis rosea',
+    'Chronic dermatitis',
+    'Pityriasis rubra pilaris'
+]
+
+# Model input order: clinical answers, age, then histopathological answers
+feature_order = [q['feature'] for q in questions['clinical']] + ['age'] + [q['feature'] for q in questions['histopathological']]
+
+# Dataset frame layout used throughout: features in model order, then the class label
+columns = feature_order + ['class']
+
+# Column order of the UCI dermatology.data file: clinical 1-11, histopathological 12-33, age 34, class
+uci_columns = [q['feature'] for q in questions['clinical']] + \
+    [q['feature'] for q in questions['histopathological']] + ['age', 'class']
+
+
+def feature_vector(answers, age):
+    """Build one model input row in ``feature_order`` from questionnaire answers."""
+    return [age if feature == 'age' else answers.get(feature, 0) for feature in feature_order]
+
+# Number of answer options per questionnaire feature (answers are 0..n-1)
+option_counts = {q['feature']: len(q['options']) for q in questions['clinical'] + questions['histopathological']}
+
+# Age bounds accepted by the questionnaire
+AGE_MIN, AGE_MAX = 1, 120
+
+
+def validate_answers(answers, age):
+    """Raise ValueError if any answer or the age is outside the questionnaire's range."""
+    unknown = set(answers) - set(option_counts)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+    for feature, value in answers.items():
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value < option_counts[feature]:
+            raise ValueError(f"Answer for '{feature}' must be an integer in 0..{option_counts[feature] - 1}")
+    if not isinstance(age, (int, float)) or isinstance(age, bool) or not AGE_MIN <= age <= AGE_MAX:
+        raise ValueError(f"Age must be a number in {AGE_MIN}..{AGE_MAX}")
+
+
+def random_answers(n, seed=0):
+    """Draw ``n`` random questionnaire vectors (float64, ``feature_order``) from the valid option ranges."""
+    rng = np.random.default_rng(seed)
+    columns = [rng.integers(AGE_MIN, AGE_MAX + 1, n) if f == 'age' else rng.integers(0, option_counts[f], n)
+               for f in feature_order]
+    return np.column_stack(columns).astype(np.float64)
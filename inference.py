@@ -0,0 +1,248 @@
+"""Model loading and vectorized prediction helpers.
+
+Everything here is free of Streamlit so it can be used from the app, the
+command line tools and the training notebook alike.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+import metrics
+from features import disease_names, feature_order, random_answers
+
+MODEL_PATH = 'skin_disease_model.pkl'
+SCALER_PATH = 'scaler.pkl'
+FAST_MODEL_PATH = 'skin_disease_model.npz'
+# Directory form of the fastpath export; memory-mapped and shared between processes
+FAST_MODEL_DIR = 'skin_disease_model'
+# Vote fractions are clipped here before taking logs in ``class_scores``
+PROBA_FLOOR = 1e-6
+
+logger = logging.getLogger(__name__)
+
+
+def load_artifacts(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    """Load the trained estimator and its fitted StandardScaler.
+
+    A ``.npz`` or directory model path loads a ``fastpath`` export instead; it
+    carries its own scaling, so the returned scaler is None.
+    """
+    if model_path.endswith('.npz') or os.path.isdir(model_path):
+        from fastpath import FastPredictor
+
+        return FastPredictor.load(model_path), None
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    return model, scaler
+
+
+def _modified(path):
+    """Modification time of a file, or of the newest file in an export directory."""
+    if os.path.isdir(path):
+        return max((os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)), default=0.0)
+    return os.path.getmtime(path)
+
+
+def serving_model_path():
+    """The preferred model artifact present on disk, or None.
+
+    A fast-path export older than the pickles was exported from an earlier
+    model and is skipped until it is exported again.
+    """
+    pickles = os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH)
+    trained = max(_modified(MODEL_PATH), _modified(SCALER_PATH)) if pickles else None
+    for path in (FAST_MODEL_DIR, FAST_MODEL_PATH):
+        if not os.path.exists(path):
+            continue
+        if trained is not None and _modified(path) < trained:
+            logger.warning("Ignoring %s: it is older than %s; re-export it with fastpath.py", path, MODEL_PATH)
+            continue
+        return path
+    return MODEL_PATH if pickles else None
+
+
+def load_serving_artifacts():
+    """Load the memory-mapped or fused fast-path model if exported, else the pickles."""
+    path = serving_model_path()
+    if path is None:
+        raise FileNotFoundError(f"No model artifact found ({FAST_MODEL_DIR}/, {FAST_MODEL_PATH} or {MODEL_PATH})")
+    return load_artifacts(path)
+
+
+class LazyModel:
+    """Load model artifacts in a background thread and warm them up.
+
+    Construction returns immediately, so a page can render while the model
+    loads; ``predict`` blocks until loading has finished. ``status`` reports
+    readiness for UIs and health checks.
+    """
+
+    def __init__(self, loader=load_serving_artifacts, warmup_rows=256):
+        self._loader = loader
+        self._warmup_rows = warmup_rows
+        self._ready = threading.Event()
+        self.model = None
+        self.scaler = None
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        threading.Thread(target=self._load, name='model-loader', daemon=True).start()
+
+    def _load(self):
+        started = time.perf_counter()
+        timer = metrics.clock()
+        try:
+            self.model, self.scaler = self._loader()
+            self.load_seconds = time.perf_counter() - started
+            metrics.observe('model_load', timer)
+            started = time.perf_counter()
+            if hasattr(self.model, 'touch'):
+                self.model.touch()
+            if self._warmup_rows:
+                self._predict(random_answers(self._warmup_rows))
+            self.warmup_seconds = time.perf_counter() - started
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    def _predict(self, X):
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        return self.model.predict(X)
+
+    def wait(self, timeout=None):
+        """Block until loading finished; raises the load error, if any."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("Model is still loading")
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and self.error is None
+
+    def predict(self, X):
+        # Through predict_matrix so the scaler and model stage timings are recorded
+        return predict_matrix(self, None, X)
+
+    def status(self):
+        if not self._ready.is_set():
+            state = 'loading'
+        elif self.error is not None:
+            state = 'failed'
+        else:
+            state = 'ready'
+        return {
+            'state': state,
+            'model_type': type(self.model).__name__ if self.model is not None else None,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'error': str(self.error) if self.error is not None else None,
+        }
+
+
+def as_matrix(rows):
+    """Return rows as a float64 (n, 34) matrix in ``feature_order``."""
+    X = np.asarray(rows, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != len(feature_order):
+        raise ValueError(f"Expected {len(feature_order)} features per row, got shape {X.shape}")
+    return X
+
+
+def predict_matrix(model, scaler, rows):
+    """Scale and predict a whole matrix of rows in one pass; returns class ids (1-6).
+
+    ``scaler`` may be None for models that take raw rows, such as
+    ``fastpath.FastPredictor`` or a ``LazyModel``, which brings its own.
+    """
+    X = as_matrix(rows)
+    if isinstance(model, LazyModel) and scaler is None:
+        model.wait()
+        model, scaler = model.model, model.scaler
+    if scaler is not None:
+        started = metrics.clock()
+        X = scaler.transform(X)
+        metrics.observe('scaler_transform', started)
+    started = metrics.clock()
+    predictions = model.predict(X)
+    metrics.observe('model_predict', started)
+    return predictions
+
+
+def model_fingerprint(model, scaler, n=2048):
+    """Hash of the model's predictions on fixed random questionnaire vectors.
+
+    Artifacts fitted for one model (a clinical table, a calibration) record
+    it so a retrained model can tell they are not its own. Two models share
+    a fingerprint only if they agree on every probe, so fastpath exports of
+    the same model keep it.
+    """
+    predictions = np.asarray(predict_matrix(model, scaler, random_answers(n, seed=0)), dtype=np.uint8)
+    return hashlib.sha256(predictions.tobytes()).hexdigest()
+
+
+def class_scores(model, X):
+    """Uncalibrated per-class scores for model inputs, one column per class id (1-6).
+
+    Forests give log vote fractions and SVCs their one-vs-rest decision values
+    (pairwise votes plus squashed margins), so an SVC never needs refitting
+    with ``probability=True``. ``calibrated_proba`` turns either into
+    probabilities.
+    """
+    if isinstance(model, LazyModel):
+        model.wait()
+        if model.scaler is not None:
+            X = model.scaler.transform(X)
+        model = model.model
+    kind = getattr(model, 'kind', None)
+    if kind == 'svc' or (kind is None and not hasattr(model, 'predict_proba')):
+        return model.decision_function(X)
+    return np.log(np.maximum(model.predict_proba(X), PROBA_FLOOR))
+
+
+def calibrated_proba(scores, temperature=1.0):
+    """Softmax of ``scores / temperature``; rows sum to 1."""
+    z = np.asarray(scores, dtype=np.float64) / temperature
+    z -= z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+def predict_proba_matrix(model, scaler, rows, temperature=1.0):
+    """Calibrated class probabilities for a whole matrix of rows; column ``j`` is class ``j + 1``.
+
+    ``temperature`` comes from ``calibration.load_temperature``; 1.0 leaves
+    forest vote fractions unchanged.
+    """
+    X = as_matrix(rows)
+    if scaler is not None:
+        started = metrics.clock()
+        X = scaler.transform(X)
+        metrics.observe('scaler_transform', started)
+    started = metrics.clock()
+    proba = calibrated_proba(class_scores(model, X), temperature)
+    metrics.observe('model_proba', started)
+    return proba
+
+
+def top_k(proba, k=3):
+    """The ``k`` most likely classes per row: (class ids, probabilities), best first."""
+    proba = np.asarray(proba)
+    order = np.argsort(-proba, axis=1, kind='stable')[:, :k]
+    return order + 1, np.take_along_axis(proba, order, axis=1)
+
+
+def class_names(predictions):
+    """Map predicted class ids (1-6) onto ``disease_names``."""
+    names = np.asarray(disease_names, dtype=object)
+    return names[np.asarray(predictions, dtype=np.int64) - 1]
@@ -0,0 +1,437 @@
+"""Load test for app.py: many concurrent simulated assessment sessions.
+
+Starts ``streamlit run app.py`` as a separate server process (or targets one
+already running with ``--url``) and connects every simulated user over its
+own websocket, speaking the same protocol a browser tab does: each
+interaction sends the session's widget states and waits for the script run
+to finish. Every simulated user is therefore a real server session with its
+own script thread and ``st.session_state``, sharing the server's
+``st.cache_resource`` objects (model, caches, session store) exactly as
+browser sessions do. A session covers the first page load, the age input,
+one rerun per clinical answer that differs from the default, optionally the
+lab section with its answers, then the results page.
+
+Answers are whole patients sampled from the cached UCI data (see
+``dataset.py``), so the low-symptom branch (clinical score <= 2) and the
+lab path are exercised at realistic rates. The report gives session and
+rerun throughput, rerun and session latency percentiles, the outcome mix,
+and the CPU time and resident memory of the server process (when this
+script started it).
+
+Usage:
+    python loadtest.py --sessions 200 --concurrency 16
+    python loadtest.py --sessions 500 --concurrency 64 --lab-fraction 0.5 --think-ms 200 --out load.json
+    python loadtest.py --url http://localhost:8501 --sessions 50
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from features import AGE_MAX, AGE_MIN, feature_order, questions
+from session_store import widget_key
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, 'app.py')
+# Default of the app's age input; setting it again would not rerun
+DEFAULT_AGE = 30
+
+
+def rss_kib(pid='self'):
+    """Current resident set of a process (Linux only; 0 elsewhere)."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return 0
+
+
+def cpu_seconds(pid):
+    """User + system CPU time used so far by a process (Linux only; 0 elsewhere)."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesized command name; utime and stime are the 14th and 15th
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except OSError:
+        return 0.0
+
+
+class _RssSampler:
+    """Peak resident memory of a process, sampled from a background thread."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_kib(pid)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak = max(self.peak, rss_kib(self.pid))
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self.peak
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_path=APP_PATH, port=None, env=None, timeout=60.0):
+    """Run ``streamlit run app_path`` headless; returns (process, base URL) once it is healthy."""
+    port = port or _free_port()
+    # A file, not a pipe: nobody reads the server's log while it runs, and a full pipe would block it
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', app_path, '--server.headless', 'true',
+         '--server.port', str(port), '--server.address', '127.0.0.1',
+         '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+        env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f"streamlit exited with code {process.returncode}: "
+                               f"{log.read().decode(errors='replace')[-2000:]}")
+        try:
+            with urllib.request.urlopen(f'{url}/_stcore/health', timeout=1) as response:
+                if response.read().strip() == b'ok':
+                    return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise TimeoutError(f"streamlit did not become healthy within {timeout:.0f}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class BrowserSession:
+    """One app session driven over the server's websocket the way a browser tab drives it.
+
+    Keeps the session's widget values and the elements of the latest script
+    run; ``rerun`` sends the widget values (plus a button click, if any) and
+    waits until the run, including any ``st.rerun()`` it triggers, has
+    finished.
+    """
+
+    def __init__(self, url, timeout=60.0):
+        self.ws_url = url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self.timeout = timeout
+        self.widgets = {}
+        self.elements = []
+        self._cached = {}
+        self._ws = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self._ws = await websocket_connect(self.ws_url, subprotocols=['streamlit'])
+        return self
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+
+    def _widget(self, kind, match):
+        for element in self.elements:
+            if element.WhichOneof('type') == kind and match(getattr(element, kind)):
+                return getattr(element, kind)
+        return None
+
+    def _all_widgets(self):
+        for element in self.elements:
+            proto = getattr(element, element.WhichOneof('type') or 'empty', None)
+            if proto is not None and getattr(proto, 'id', ''):
+                yield proto
+
+    async def set_value(self, key, value):
+        """Change the widget with user key ``key`` and rerun."""
+        from streamlit.proto.NumberInput_pb2 import NumberInput
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = next((w for w in self._all_widgets() if w.id.endswith(f'-{key}')), None)
+        if widget is None:
+            raise LookupError(f"No widget with key '{key}' on the page")
+        state = WidgetState(id=widget.id)
+        if isinstance(widget, NumberInput) and widget.data_type != NumberInput.INT:
+            state.double_value = value
+        else:
+            state.int_value = value
+        self.widgets[widget.id] = state
+        await self.rerun()
+
+    async def click(self, label):
+        """Click the button labelled ``label`` and rerun."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        button = self._widget('button', lambda b: b.label == label)
+        if button is None:
+            raise LookupError(f"No '{label}' button on the page")
+        await self.rerun(WidgetState(id=button.id, trigger_value=True))
+
+    async def rerun(self, trigger=None):
+        await asyncio.wait_for(self._rerun(trigger), self.timeout)
+
+    async def _rerun(self, trigger):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        states = msg.rerun_script.widget_states.widgets
+        states.extend(self.widgets.values())
+        if trigger is not None:
+            states.append(trigger)
+        await self._ws.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            data = await self._ws.read_message()
+            if data is None:
+                raise ConnectionError("Server closed the session")
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'ref_hash':
+                # The server sends large messages it has sent before by hash only
+                forward = self._cached[forward.ref_hash]
+                kind = forward.WhichOneof('type')
+            elif forward.hash:
+                self._cached[forward.hash] = forward
+            if kind == 'new_session':
+                self.elements = []
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                self.elements.append(forward.delta.new_element)
+            elif kind == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        # Widgets that are gone no longer send a value, as in a browser
+        present = {w.id for w in self._all_widgets()}
+        self.widgets = {i: s for i, s in self.widgets.items() if i in present}
+
+    def outcome(self):
+        from streamlit.proto.Alert_pb2 import Alert
+
+        alerts = [(e.alert.format, e.alert.body) for e in self.elements if e.WhichOneof('type') == 'alert']
+        if (Alert.SUCCESS, "## Assessment Complete") in alerts:
+            return 'prediction'
+        if (Alert.INFO, "## Assessment Complete") in alerts:
+            return 'low_symptom'
+        if (any(e.WhichOneof('type') == 'exception' for e in self.elements)
+                or any(f == Alert.ERROR and 'Error during assessment' in body for f, body in alerts)):
+            return 'error'
+        return 'incomplete'
+
+
+def sample_patients(n, seed=0):
+    """``n`` answer rows in ``feature_order`` drawn (with replacement) from the UCI data."""
+    from dataset import load_arrays
+
+    X, _ = load_arrays()
+    rng = np.random.default_rng(seed)
+    return np.asarray(X)[rng.integers(0, len(X), n)].astype(np.int64)
+
+
+async def run_session(url, row, with_lab, timeout=60.0, think=0.0):
+    """Drive one assessment for ``row``; returns rerun timings and the outcome."""
+    reruns = []
+
+    async def step(action, *args):
+        if think:
+            await asyncio.sleep(think)
+        started = time.perf_counter()
+        await action(*args)
+        reruns.append(time.perf_counter() - started)
+
+    session_started = time.perf_counter()
+    session = await BrowserSession(url, timeout).connect()
+    try:
+        await step(session.rerun)
+        age = int(np.clip(row[feature_order.index('age')], AGE_MIN, AGE_MAX))
+        if age != DEFAULT_AGE:
+            await step(session.set_value, 'age_input', age)
+        for q in questions['clinical']:
+            value = int(row[feature_order.index(q['feature'])])
+            if value:
+                await step(session.set_value, widget_key(q['feature']), value)
+        if with_lab:
+            await step(session.click, "Add Lab Results (Optional)")
+            for q in questions['histopathological']:
+                value = int(row[feature_order.index(q['feature'])])
+                if value:
+                    await step(session.set_value, widget_key(q['feature']), value)
+            await step(session.click, "Get Assessment Results")
+        else:
+            await step(session.click, "Get Results Now")
+        outcome = session.outcome()
+    finally:
+        session.close()
+    return {
+        'seconds': time.perf_counter() - session_started,
+        'reruns': reruns,
+        'outcome': outcome,
+        'lab': with_lab,
+    }
+
+
+async def _run_all(url, rows, with_lab, concurrency, timeout, think):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def bounded(row, lab):
+        async with limit:
+            return await run_session(url, row, lab, timeout, think)
+
+    return await asyncio.gather(*(bounded(row, lab) for row, lab in zip(rows, with_lab)), return_exceptions=True)
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=np.float64) * 1000.0
+    if not values.size:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': values.max(), 'mean_ms': values.mean()}
+
+
+def run(url, n_sessions=100, concurrency=8, lab_fraction=0.3, think=0.0, timeout=60.0, seed=0, server_pid=None):
+    """Run ``n_sessions`` sessions against ``url``, ``concurrency`` at a time; returns a JSON-ready report.
+
+    ``server_pid`` is the server process whose CPU time and memory are reported.
+    """
+    import streamlit
+
+    rows = sample_patients(n_sessions, seed)
+    with_lab = np.random.default_rng(seed + 1).random(n_sessions) < lab_fraction
+
+    # One session first, alone: it pays for the model load and cache warm-up
+    warmup = asyncio.run(run_session(url, rows[0], False, timeout))
+
+    if server_pid is not None:
+        rss_before = rss_kib(server_pid)
+        sampler = _RssSampler(server_pid)
+        cpu_started = cpu_seconds(server_pid)
+    started = time.perf_counter()
+    outcomes_or_errors = asyncio.run(_run_all(url, rows, with_lab, concurrency, timeout, think))
+    elapsed = time.perf_counter() - started
+    results = [r for r in outcomes_or_errors if not isinstance(r, BaseException)]
+    failures = [repr(r) for r in outcomes_or_errors if isinstance(r, BaseException)]
+
+    reruns = [t for r in results for t in r['reruns']]
+    outcomes = {}
+    for r in results:
+        outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {'sessions': n_sessions, 'concurrency': concurrency, 'lab_fraction': lab_fraction,
+                   'think_ms': think * 1000.0, 'url': url},
+        'warmup_session_seconds': warmup['seconds'],
+        'warmup_outcome': warmup['outcome'],
+        'seconds': elapsed,
+        'sessions_per_s': len(results) / elapsed,
+        'reruns_per_s': len(reruns) / elapsed,
+        'reruns_per_session': len(reruns) / len(results) if results else 0.0,
+        'rerun_latency': _percentiles(reruns),
+        'session_latency': _percentiles([r['seconds'] for r in results]),
+        'outcomes': outcomes,
+        'lab_sessions': int(sum(r['lab'] for r in results)),
+        'failures': failures,
+    }
+    if server_pid is not None:
+        cpu = cpu_seconds(server_pid) - cpu_started
+        report['server_cpu'] = {'seconds': cpu, 'cores_used': cpu / elapsed}
+        report['server_rss_kib'] = {'before': rss_before, 'peak': sampler.stop(), 'after': rss_kib(server_pid)}
+    return report
+
+
+def _print_report(report):
+    c = report['config']
+    print(f"{c['sessions']} sessions against {c['url']}, concurrency {c['concurrency']}, "
+          f"{report['lab_sessions']} with lab results, think time {c['think_ms']:.0f} ms")
+    print(f"  warm-up session: {report['warmup_session_seconds']:.2f} s ({report['warmup_outcome']})")
+    print(f"  throughput:      {report['sessions_per_s']:.2f} sessions/s, {report['reruns_per_s']:.1f} reruns/s "
+          f"({report['reruns_per_session']:.1f} reruns/session)")
+    for name in ('rerun_latency', 'session_latency'):
+        s = report[name]
+        if s:
+            print(f"  {name.replace('_', ' ') + ':':<16} p50 {s['p50_ms']:.1f} ms, p90 {s['p90_ms']:.1f} ms, "
+                  f"p99 {s['p99_ms']:.1f} ms, max {s['max_ms']:.1f} ms")
+    print(f"  outcomes:        {', '.join(f'{k} {v}' for k, v in sorted(report['outcomes'].items()))}")
+    if 'server_cpu' in report:
+        cpu, r = report['server_cpu'], report['server_rss_kib']
+        print(f"  server CPU:      {cpu['seconds']:.1f} s ({cpu['cores_used']:.2f} cores)")
+        print(f"  server RSS:      {r['before'] / 1024:.0f} MiB before, {r['peak'] / 1024:.0f} MiB peak, "
+              f"{r['after'] / 1024:.0f} MiB after")
+    if report['failures']:
+        print(f"  {len(report['failures'])} sessions failed, e.g. {report['failures'][0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent assessment sessions against app.py.")
+    parser.add_argument('--sessions', type=int, default=100, help="sessions to run (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, default=8, help="sessions in flight at once (default: %(default)s)")
+    parser.add_argument('--lab-fraction', type=float, default=0.3,
+                        help="share of sessions that fill in the lab section (default: %(default)s)")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="pause before each interaction (default: none)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="seconds allowed per rerun (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--app', default=APP_PATH, help="script to serve (default: app.py)")
+    parser.add_argument('--port', type=int, help="port for the server this starts (default: a free one)")
+    parser.add_argument('--url', help="test an already running server instead of starting one")
+    parser.add_argument('--keep-audit-log', action='store_true',
+                        help="let the app write simulated assessments to its assessment log")
+    parser.add_argument('--out', help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        url, pid = args.url, None
+    else:
+        env = dict(os.environ)
+        if not args.keep_audit_log:
+            env['SDP_AUDIT_LOG'] = ''
+        process, url = start_server(args.app, args.port, env)
+        pid = process.pid
+    try:
+        report = run(url, args.sessions, args.concurrency, args.lab_fraction, args.think_ms / 1000.0,
+                     args.timeout, args.seed, pid)
+    finally:
+        if process is not None:
+            stop_server(process)
+    _print_report(report)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.out}")
+    return 1 if report['failures'] or report['outcomes'].get('error') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
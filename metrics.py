@@ -0,0 +1,194 @@
+"""Opt-in timing histograms for the assessment flow.
+
+Instrumentation is off unless the ``SDP_METRICS`` environment variable is set
+to ``1``; until then ``clock``/``observe``/``count`` are near no-ops. When
+enabled, stage timings are aggregated into Prometheus-style histograms in a
+process-wide registry shared by every Streamlit session, and exposed through:
+
+* ``SDP_METRICS_PORT``: serve the Prometheus text format on
+  ``http://127.0.0.1:<port>/metrics`` from a background thread; set
+  ``SDP_METRICS_HOST`` (e.g. ``0.0.0.0``) to let a remote scraper in
+* ``SDP_METRICS_LOG_INTERVAL``: log the same text to stderr every N seconds,
+  whatever level Streamlit leaves the root logger at
+
+Usage in code:
+    started = metrics.clock()
+    ...
+    metrics.observe('model_predict', started)
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans sub-millisecond predictions up to slow cold starts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition model."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, out = 0, []
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+
+class Registry:
+    """Thread-safe set of per-stage histograms, event counters and gauges."""
+
+    def __init__(self, prefix='sdp'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, event, n=1):
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def render(self):
+        """Prometheus text exposition of everything recorded so far."""
+        name = f'{self.prefix}_stage_seconds'
+        lines = [f'# HELP {name} Time spent in each stage of the assessment flow.', f'# TYPE {name} histogram']
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                for bound, total in h.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {total}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            counter = f'{self.prefix}_events_total'
+            lines += [f'# HELP {counter} Assessment flow events.', f'# TYPE {counter} counter']
+            for event, total in sorted(self._counters.items()):
+                lines.append(f'{counter}{{event="{event}"}} {total}')
+            gauge = f'{self.prefix}_gauge'
+            lines += [f'# HELP {gauge} Current values such as active sessions and their memory.',
+                      f'# TYPE {gauge} gauge']
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f'{gauge}{{name="{name}"}} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+enabled = os.environ.get('SDP_METRICS') == '1'
+
+
+def clock():
+    """Start time for ``observe``; returns None when metrics are disabled."""
+    return time.perf_counter() if enabled else None
+
+
+def observe(stage, started):
+    """Record the time since ``started`` (from ``clock``) under ``stage``."""
+    if started is not None:
+        registry.observe(stage, time.perf_counter() - started)
+
+
+def count(event, n=1):
+    if enabled:
+        registry.count(event, n)
+
+
+def gauge(name, value):
+    """Set the current value of ``name``."""
+    if enabled:
+        registry.gauge(name, value)
+
+
+def _serve(port, host='127.0.0.1'):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def _log_periodically(interval):
+    # Streamlit leaves the root logger at WARNING with no handler, which would
+    # drop these INFO dumps; give this logger its own handler instead
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(handler)
+        logger.propagate = False
+    if not logger.isEnabledFor(logging.INFO):
+        logger.setLevel(logging.INFO)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            logger.info("Assessment metrics:\n%s", registry.render())
+
+    threading.Thread(target=loop, name='metrics-log', daemon=True).start()
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the HTTP endpoint and/or periodic log dump configured in the environment.
+
+    Safe to call on every Streamlit rerun; exporters start once per process.
+    """
+    global _exporters_started
+    if not enabled:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        port = os.environ.get('SDP_METRICS_PORT')
+        if port:
+            try:
+                _serve(int(port), os.environ.get('SDP_METRICS_HOST', '127.0.0.1'))
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+        interval = os.environ.get('SDP_METRICS_LOG_INTERVAL')
+        if interval:
+            _log_periodically(float(interval))
@@ -0,0 +1,162 @@
+"""Bounded, thread-safe memo of predictions keyed on the packed answer vector.
+
+Questionnaire answers are small ordinals (0-3) and age is a whole number of
+years, so real traffic repeats the same vectors often; the "Get Results Now"
+path in particular zeroes all 22 lab answers. Each row is packed into a
+single integer (2 bits per answer, 7 bits for age) and used as the key of an
+LRU map whose entries also expire after ``ttl`` seconds. An entry holds the
+class id and, once ``predict_proba`` has asked for it, the probability row,
+so a repeat assessment gets both without touching the model.
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+from features import feature_order
+
+_BITS = [7 if f == 'age' else 2 for f in feature_order]
+_ANSWER_LIMITS = np.array([1 << bits for bits in _BITS])
+_SHIFTS = np.cumsum([0] + _BITS[:-1]).tolist()
+
+
+def pack_key(row):
+    """Pack one row in ``feature_order`` into a hashable key.
+
+    Rows of whole-number answers within the questionnaire's ranges pack into
+    one int; anything else (e.g. fractional values) falls back to raw bytes.
+    """
+    row = np.asarray(row, dtype=np.float64)
+    ints = row.astype(np.int64)
+    if np.array_equal(ints, row) and np.all((ints >= 0) & (ints < _ANSWER_LIMITS)):
+        key = 0
+        for value, shift in zip(ints.tolist(), _SHIFTS):
+            key |= value << shift
+        return key
+    return row.tobytes()
+
+
+def unpack_key(key):
+    """Inverse of ``pack_key`` for integer keys."""
+    return [(key >> shift) & ((1 << bits) - 1) for shift, bits in zip(_SHIFTS, _BITS)]
+
+
+def _as_rows(rows):
+    rows = np.asarray(rows, dtype=np.float64)
+    return rows.reshape(1, -1) if rows.ndim == 1 else rows
+
+
+class PredictionCache:
+    """LRU + TTL cache of predicted class ids (and probabilities) with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=4096, ttl=3600.0, clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if self.ttl is not None and now >= expires:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value, now):
+        expires = now + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, keys, with_proba):
+        """Cached ``(class_id, proba)`` entries by row index, and the indices to compute."""
+        found, missing = {}, []
+        with self._lock:
+            now = self._clock()
+            for i, key in enumerate(keys):
+                value = self._get(key, now)
+                if value is None or (with_proba and value[1] is None):
+                    missing.append(i)
+                else:
+                    found[i] = value
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def _store(self, keys, values):
+        with self._lock:
+            now = self._clock()
+            for key, value in zip(keys, values):
+                self._put(key, value, now)
+
+    def predict(self, rows, predict_fn):
+        """Return class ids for ``rows``, calling ``predict_fn`` only on the misses.
+
+        ``predict_fn`` receives a 2-D array of the uncached rows and is called
+        at most once per call, so batches stay vectorized.
+        """
+        rows = _as_rows(rows)
+        keys = [pack_key(row) for row in rows]
+        found, missing = self._lookup(keys, with_proba=False)
+        result = np.empty(len(keys), dtype=np.int64)
+        for i, (prediction, _) in found.items():
+            result[i] = prediction
+        if missing:
+            predictions = np.asarray(predict_fn(rows[missing]))
+            result[missing] = predictions
+            self._store([keys[i] for i in missing], [(p, None) for p in predictions.tolist()])
+        return result
+
+    def predict_proba(self, rows, predict_fn, proba_fn):
+        """Return ``(class_ids, probabilities)`` for ``rows``; a hit needs no model call.
+
+        ``predict_fn`` and ``proba_fn`` each receive the 2-D array of rows
+        missing either value and are called at most once per call.
+        """
+        rows = _as_rows(rows)
+        keys = [pack_key(row) for row in rows]
+        found, missing = self._lookup(keys, with_proba=True)
+        if missing:
+            X = rows[missing]
+            computed = list(zip(np.asarray(predict_fn(X)).tolist(), np.asarray(proba_fn(X), dtype=np.float64)))
+            self._store([keys[i] for i in missing], computed)
+            found.update(zip(missing, computed))
+        classes = np.array([found[i][0] for i in range(len(keys))], dtype=np.int64)
+        return classes, np.vstack([found[i][1] for i in range(len(keys))])
+
+    def predict_one(self, row, predict_fn):
+        """Return the class id for a single row."""
+        return int(self.predict([row], predict_fn)[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
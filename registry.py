@@ -0,0 +1,432 @@
+"""Versioned model registry with hot reload and shadow scoring.
+
+Each published model lives in its own version directory with the artifact,
+its scaler and a ``metadata.json`` (test accuracy, a hash of
+``feature_order``, model kind and training date):
+
+    model_registry/
+        CURRENT             version served to users, e.g. "v0003"
+        CANDIDATE           optional version scored in shadow mode
+        v0001/  skin_disease_model.pkl  scaler.pkl  metadata.json
+        v0002/  ...
+
+Pointers are replaced atomically, so switching versions is a one-file write
+that running servers pick up without a restart: ``HotModel`` polls
+``CURRENT`` and swaps a fully loaded and warmed-up model in, the app keys its
+cached model on the pointer. ``ShadowScorer`` scores a candidate on the same
+rows in a background thread pool and counts how often it agrees with the
+served model, without adding to request latency; ``CandidateShadow`` follows
+``CANDIDATE`` and switches scorers when it or the served version changes.
+
+Usage:
+    python registry.py publish --model skin_disease_model.pkl --scaler scaler.pkl --accuracy 0.986
+    python registry.py list
+    python registry.py activate v0002
+    python registry.py shadow v0003          # or --clear
+"""
+
+import argparse
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from features import feature_order, random_answers
+from inference import LazyModel, load_artifacts, predict_matrix
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = 'model_registry'
+METADATA_FILE = 'metadata.json'
+CURRENT = 'CURRENT'
+CANDIDATE = 'CANDIDATE'
+
+
+def schema_hash():
+    """Short hash of ``feature_order``; models trained on another column order don't load."""
+    return hashlib.sha256(json.dumps(feature_order).encode()).hexdigest()[:16]
+
+
+def version_path(version, path=REGISTRY_DIR):
+    return os.path.join(path, version)
+
+
+def versions(path=REGISTRY_DIR):
+    """Metadata of every published version, oldest first."""
+    if not os.path.isdir(path):
+        return []
+    found = []
+    for name in sorted(os.listdir(path)):
+        metadata_path = os.path.join(path, name, METADATA_FILE)
+        if name.startswith('v') and os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                found.append(json.load(f))
+    return found
+
+
+def _read_pointer(path, name):
+    try:
+        with open(os.path.join(path, name)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(path, name, version):
+    if version is None:
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+        return
+    if not os.path.exists(os.path.join(path, version, METADATA_FILE)):
+        raise ValueError(f"Unknown model version: {version}")
+    fd, tmp = tempfile.mkstemp(dir=path, prefix=f'.{name}.')
+    with os.fdopen(fd, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(path, name))
+
+
+def current_version(path=REGISTRY_DIR):
+    """Version served to users, or None without a registry."""
+    return _read_pointer(path, CURRENT)
+
+
+def candidate_version(path=REGISTRY_DIR):
+    """Version scored in shadow mode, or None."""
+    return _read_pointer(path, CANDIDATE)
+
+
+def activate(version, path=REGISTRY_DIR):
+    _write_pointer(path, CURRENT, version)
+
+
+def set_candidate(version, path=REGISTRY_DIR):
+    """Score ``version`` in shadow mode; None stops shadow scoring."""
+    _write_pointer(path, CANDIDATE, version)
+
+
+def _copy(src, dst_dir):
+    dst = os.path.join(dst_dir, os.path.basename(os.path.normpath(src)))
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+    return os.path.basename(dst)
+
+
+def publish(model_path, scaler_path=None, accuracy=None, path=REGISTRY_DIR, extra_files=(), activate_now=False,
+            **info):
+    """Copy a trained model into a new version directory; returns the version name.
+
+    ``model_path`` is a pickled estimator (with ``scaler_path``) or a
+    ``fastpath`` export. ``extra_files`` such as ``calibration.json`` or a
+    clinical table are copied alongside, and ``info`` is stored in the
+    metadata. The version directory appears atomically once complete.
+    """
+    from calibration import model_kind
+
+    model, scaler = load_artifacts(model_path, scaler_path)
+    os.makedirs(path, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=path, prefix='.publish-')
+    try:
+        metadata = {
+            'model_file': _copy(model_path, staging),
+            # fastpath exports carry their own scaling
+            'scaler_file': _copy(scaler_path, staging) if scaler is not None else None,
+            'model_kind': model_kind(model),
+            'accuracy': accuracy,
+            'feature_schema': schema_hash(),
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        }
+        metadata['extra_files'] = [_copy(extra, staging) for extra in extra_files]
+        metadata.update(info)
+        while True:
+            numbers = [int(m['version'][1:]) for m in versions(path)]
+            version = f'v{max(numbers, default=0) + 1:04d}'
+            metadata['version'] = version
+            with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            try:
+                os.rename(staging, version_path(version, path))
+                break
+            except OSError:
+                # Another publisher took this number first
+                if not os.path.exists(version_path(version, path)):
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if activate_now:
+        activate(version, path)
+    return version
+
+
+def load_version(version, path=REGISTRY_DIR):
+    """(model, scaler, metadata) for a published version.
+
+    Raises ValueError if the version was trained on a different feature schema.
+    """
+    directory = version_path(version, path)
+    with open(os.path.join(directory, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    if metadata.get('feature_schema') != schema_hash():
+        raise ValueError(f"Model {version} was trained on a different feature schema")
+    scaler_file = metadata.get('scaler_file')
+    model, scaler = load_artifacts(os.path.join(directory, metadata['model_file']),
+                                   os.path.join(directory, scaler_file) if scaler_file else None)
+    return model, scaler, metadata
+
+
+class HotModel:
+    """The registry's current version, swapped for a new one without a restart.
+
+    A background thread polls ``CURRENT`` every ``poll_interval`` seconds. A
+    new version is loaded and warmed up while the old one keeps serving, then
+    swapped in; a version that fails to load is logged and skipped.
+    ``listeners`` are called after each swap (e.g. to clear caches).
+    """
+
+    def __init__(self, path=REGISTRY_DIR, poll_interval=2.0, warmup_rows=256):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.warmup_rows = warmup_rows
+        self.listeners = []
+        self.reloads = 0
+        self.error = None
+        self._failed = None
+        self._lock = threading.Lock()
+        version = current_version(path)
+        if version is None:
+            raise FileNotFoundError(f"No current model version in {path}")
+        self.version = version
+        self.model, self.scaler, self.metadata = load_version(version, path)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='model-reload', daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.check()
+
+    def check(self):
+        """Swap in the current version if it changed; returns True on a swap."""
+        version = current_version(self.path)
+        if version is None or version in (self.version, self._failed):
+            return False
+        try:
+            model, scaler, metadata = load_version(version, self.path)
+            if self.warmup_rows:
+                predict_matrix(model, scaler, random_answers(self.warmup_rows))
+        except Exception as e:
+            self._failed, self.error = version, e
+            logger.warning("Keeping model %s; loading %s failed: %s", self.version, version, e)
+            metrics.count('model_reload_error')
+            return False
+        with self._lock:
+            self.model, self.scaler, self.metadata, self.version = model, scaler, metadata, version
+            self.reloads += 1
+            self.error = None
+        metrics.count('model_reload')
+        for listener in self.listeners:
+            listener()
+        return True
+
+    def predict(self, X):
+        with self._lock:
+            model, scaler = self.model, self.scaler
+        return predict_matrix(model, scaler, X)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+class ShadowScorer:
+    """Score a candidate model on live rows in a background thread pool.
+
+    ``submit`` returns immediately; at most ``max_pending`` batches wait for
+    the pool and further ones are dropped, so a slow candidate never backs
+    up into the served requests.
+    """
+
+    def __init__(self, model, scaler=None, version=None, max_workers=1, max_pending=64):
+        self.model = model
+        self.scaler = scaler
+        self.version = version
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix='shadow')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.compared = 0
+        self.agreed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.disagreements = collections.Counter()
+
+    def submit(self, rows, primary):
+        """Queue ``rows`` and the served model's class ids for comparison."""
+        rows = np.array(rows, dtype=np.float64)
+        primary = np.array(primary, dtype=np.int64).ravel()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += len(primary)
+                metrics.count('shadow_dropped', len(primary))
+                return None
+            self._pending += 1
+        return self._pool.submit(self._score, rows, primary)
+
+    def _score(self, rows, primary):
+        try:
+            shadow = np.asarray(predict_matrix(self.model, self.scaler, rows), dtype=np.int64)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self.errors += len(primary)
+            metrics.count('shadow_error', len(primary))
+            raise
+        agree = shadow == primary
+        with self._lock:
+            self._pending -= 1
+            self.compared += len(primary)
+            self.agreed += int(agree.sum())
+            self.disagreements.update(zip(primary[~agree].tolist(), shadow[~agree].tolist()))
+        metrics.count('shadow_agree', int(agree.sum()))
+        metrics.count('shadow_disagree', int((~agree).sum()))
+        return shadow
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'compared': self.compared,
+                'agreement': self.agreed / self.compared if self.compared else None,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'pending': self._pending,
+                'disagreements': {f'{served}->{shadow}': n
+                                  for (served, shadow), n in self.disagreements.most_common()},
+            }
+
+    def close(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+class CandidateShadow:
+    """Shadow-score whichever version the registry currently names as candidate.
+
+    ``version`` pins the candidate instead of following ``CANDIDATE``; a
+    candidate that is the served version is not scored. ``refresh`` swaps in a
+    ``ShadowScorer`` for a new candidate (loading in the background) and shuts
+    the replaced scorer's pool down. Given a ``HotModel`` as ``served``, it
+    refreshes after every model swap and polls ``CANDIDATE`` every
+    ``poll_interval`` seconds; otherwise the caller refreshes.
+    """
+
+    def __init__(self, path=REGISTRY_DIR, version=None, served=None, poll_interval=2.0, **scorer_args):
+        self.path = path
+        self.pinned = version
+        self.poll_interval = poll_interval
+        self.scorer_args = scorer_args
+        self.scorer = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        if served is not None:
+            self.refresh(served.version)
+            served.listeners.append(lambda: self.refresh(served.version))
+            self._thread = threading.Thread(target=self._watch, args=(served,), name='shadow-reload', daemon=True)
+            self._thread.start()
+
+    def _watch(self, served):
+        while not self._stopped.wait(self.poll_interval):
+            self.refresh(served.version)
+
+    def refresh(self, served_version):
+        """Follow the registry's candidate; returns the active ShadowScorer or None."""
+        version = self.pinned or candidate_version(self.path)
+        if version == served_version:
+            version = None
+        with self._lock:
+            old = self.scorer
+            if version == (old.version if old is not None else None):
+                return old
+            self.scorer = None
+            if version is not None:
+                path = self.path
+                model = LazyModel(lambda: load_version(version, path)[:2], warmup_rows=0)
+                self.scorer = ShadowScorer(model, version=version, **self.scorer_args)
+            scorer = self.scorer
+        if old is not None:
+            old.close(wait=False)
+        logger.info("Shadow scoring %s", version or "off")
+        metrics.count('shadow_reload')
+        return scorer
+
+    def submit(self, rows, primary):
+        scorer = self.scorer
+        return scorer.submit(rows, primary) if scorer is not None else None
+
+    def stats(self):
+        scorer = self.scorer
+        return scorer.stats() if scorer is not None else None
+
+    def close(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            scorer, self.scorer = self.scorer, None
+        if scorer is not None:
+            scorer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument('--registry', default=REGISTRY_DIR, help="registry directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish_cmd = commands.add_parser('publish', help="add a trained model as a new version")
+    publish_cmd.add_argument('--model', required=True, help="pickled model or fastpath export")
+    publish_cmd.add_argument('--scaler', help="pickled scaler (not needed for fastpath exports)")
+    publish_cmd.add_argument('--accuracy', type=float, help="held-out test accuracy")
+    publish_cmd.add_argument('--extra', action='append', default=[],
+                             help="file to store with the model, e.g. calibration.json (repeatable)")
+    publish_cmd.add_argument('--activate', action='store_true', help="serve the new version right away")
+    commands.add_parser('list', help="show published versions")
+    activate_cmd = commands.add_parser('activate', help="serve a version")
+    activate_cmd.add_argument('version')
+    shadow_cmd = commands.add_parser('shadow', help="score a version in shadow mode")
+    shadow_cmd.add_argument('version', nargs='?')
+    shadow_cmd.add_argument('--clear', action='store_true', help="stop shadow scoring")
+    args = parser.parse_args(argv)
+
+    if args.command == 'publish':
+        version = publish(args.model, args.scaler, args.accuracy, args.registry, args.extra, args.activate)
+        print(f"Published {version}{' (active)' if args.activate else ''}")
+    elif args.command == 'list':
+        current, candidate = current_version(args.registry), candidate_version(args.registry)
+        for m in versions(args.registry):
+            flag = '*' if m['version'] == current else 'S' if m['version'] == candidate else ' '
+            accuracy = f"{m['accuracy']:.4f}" if m.get('accuracy') is not None else '   n/a'
+            print(f"{flag} {m['version']}  {m['model_kind']:<6}  accuracy {accuracy}  {m['created']}")
+    elif args.command == 'activate':
+        activate(args.version, args.registry)
+        print(f"Serving {args.version}")
+    else:
+        if args.clear == (args.version is not None):
+            parser.error("shadow needs either a version or --clear")
+        set_candidate(args.version, args.registry)
+        print("Shadow scoring off" if args.clear else f"Shadow scoring {args.version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""HTTP/JSON prediction service with request micro-batching.
+
+Concurrent single-patient requests are queued and grouped into micro-batches
+so each ``scaler.transform`` + ``model.predict`` call runs over a matrix
+rather than a single row.
+
+Endpoints:
+    POST /predict   {"age": 42, "answers": {"erythema": 2, ...}}
+                    or {"features": [34 values in feature_order]}, one patient each
+    GET  /health    liveness check
+    GET  /stats     batching counters, server-side latency percentiles and,
+                    when serving from the registry, model version and shadow
+                    agreement; with a drift reference, the latest drift check
+
+Usage:
+    python serve.py --port 8000 --max-batch-size 32 --max-wait-ms 5
+    python serve.py --registry model_registry --shadow v0004
+"""
+
+import argparse
+import collections
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from features import feature_order, feature_vector, validate_answers
+from inference import MODEL_PATH, SCALER_PATH, as_matrix, class_names, load_artifacts, predict_matrix
+from prediction_cache import PredictionCache
+from registry import CandidateShadow, HotModel
+from drift import REFERENCE_PATH, DriftMonitor
+
+
+class MicroBatcher:
+    """Group rows submitted from many threads into batched predictions.
+
+    A single worker thread waits for the first queued row, then keeps
+    collecting until ``max_batch_size`` rows are queued or ``max_wait_ms`` has
+    passed, and predicts the whole batch at once.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, latency_window=10000):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=latency_window)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one feature row; returns a Future resolving to its class id."""
+        row = as_matrix(row)
+        if row.shape[0] != 1:
+            raise ValueError(f"Expected a single row, got {row.shape[0]}")
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def close(self):
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            # Each request's answer is its own slice of the batch's predictions
+            stops = np.cumsum([len(row) for row, _, _ in batch])
+            try:
+                predictions = np.asarray(self.predict_fn(np.vstack([row for row, _, _ in batch])))
+                if len(predictions) != stops[-1]:
+                    raise RuntimeError(f"Model returned {len(predictions)} predictions for {stops[-1]} rows")
+            except Exception as e:
+                with self._lock:
+                    self.errors += len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            done = time.perf_counter()
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self._latencies.extend(done - t for _, _, t in batch)
+            for (row, future, _), stop in zip(batch, stops):
+                future.set_result(int(predictions[stop - len(row)]))
+
+    def stats(self):
+        with self._lock:
+            latencies = np.fromiter(self._latencies, dtype=np.float64)
+            requests, batches, errors = self.requests, self.batches, self.errors
+        elapsed = time.monotonic() - self.started_at
+        stats = {
+            'requests': requests,
+            'batches': batches,
+            'errors': errors,
+            'mean_batch_size': requests / batches if batches else 0.0,
+            'requests_per_second': requests / elapsed if elapsed > 0 else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+        }
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000.0
+            stats.update(latency_ms={'p50': p50, 'p95': p95, 'p99': p99, 'max': latencies.max() * 1000.0})
+        return stats
+
+
+def parse_patient(payload):
+    """Turn a request body into one model input row.
+
+    Either form is checked with ``validate_answers``: one patient per
+    request, every answer an in-range integer and a finite age.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    if 'features' in payload:
+        values = payload['features']
+        if not isinstance(values, list) or len(values) != len(feature_order):
+            raise ValueError(f"'features' must be a list of {len(feature_order)} values in feature_order")
+        answers = dict(zip(feature_order, values))
+        age = answers.pop('age')
+    else:
+        answers = payload.get('answers', {})
+        age = payload.get('age')
+        if not isinstance(answers, dict):
+            raise ValueError("'answers' must be an object of feature -> option index")
+    validate_answers(answers, age)
+    return as_matrix(feature_vector(answers, age))
+
+
+def make_handler(batcher, cache=None, timeout=10.0, model=None, shadow=None, drift=None):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                stats = batcher.stats()
+                if cache is not None:
+                    stats['cache'] = cache.stats()
+                if isinstance(model, HotModel):
+                    stats['model'] = {'version': model.version, 'reloads': model.reloads,
+                                      'error': str(model.error) if model.error is not None else None}
+                if shadow is not None:
+                    stats['shadow'] = shadow.stats()
+                if drift is not None:
+                    report = drift.check()
+                    stats['drift'] = {'rows': report['rows'], 'drifted': report['drifted'],
+                                      'predictions_psi': report['predictions_psi']}
+                self._send(200, stats)
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                row = parse_patient(json.loads(self.rfile.read(length) or b'null'))
+            except (ValueError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+                return
+            try:
+                prediction = batcher.predict(row, timeout)
+            except Exception as e:
+                self._send(500, {'error': f"Prediction failed: {e}"})
+                return
+            self._send(200, {
+                'predicted_class': prediction,
+                'predicted_disease': class_names([prediction])[0],
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictionHandler
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Kiosk bursts easily exceed the default listen backlog of 5
+    request_queue_size = 128
+
+
+def make_server(model, scaler, host='127.0.0.1', port=8000, max_batch_size=32, max_wait_ms=5.0,
+                cache_size=4096, shadow=None, drift=None):
+    """Build a ready-to-run server; its ``batcher`` attribute holds the MicroBatcher.
+
+    With ``cache_size`` > 0, each micro-batch only sends rows missing from a
+    shared PredictionCache to the model. A ``registry.HotModel`` clears that
+    cache whenever it swaps versions. A ``registry.ShadowScorer`` or
+    ``registry.CandidateShadow`` gets every batch after it has been answered,
+    and a ``drift.DriftMonitor`` counts every batch's answers and predictions.
+    """
+    def predict_fn(X):
+        return predict_matrix(model, scaler, X)
+
+    cache = PredictionCache(maxsize=cache_size) if cache_size > 0 else None
+    if cache is not None:
+        served_fn = lambda X: cache.predict(X, predict_fn)
+        if isinstance(model, HotModel):
+            model.listeners.append(cache.clear)
+    else:
+        served_fn = predict_fn
+    if shadow is not None or drift is not None:
+        def batch_fn(X):
+            predictions = served_fn(X)
+            if shadow is not None:
+                shadow.submit(X, predictions)
+            if drift is not None:
+                drift.update(X, predictions)
+            return predictions
+    else:
+        batch_fn = served_fn
+    batcher = MicroBatcher(batch_fn, max_batch_size, max_wait_ms)
+    server = PredictionServer((host, port), make_handler(batcher, cache, model=model, shadow=shadow, drift=drift))
+    server.batcher = batcher
+    server.cache = cache
+    server.shadow = shadow
+    server.drift = drift
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve skin disease predictions over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default=MODEL_PATH, help="path to the pickled model or a fastpath .npz export")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="path to the pickled scaler")
+    parser.add_argument('--max-batch-size', type=int, default=32,
+                        help="largest micro-batch passed to the model (default: %(default)s)")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="longest a request waits for a batch to fill (default: %(default)s)")
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help="answer vectors kept in the prediction cache; 0 disables it (default: %(default)s)")
+    parser.add_argument('--registry', help="serve the registry's current version and reload it when that changes "
+                                           "(overrides --model/--scaler)")
+    parser.add_argument('--shadow', help="registry version to score in shadow mode (default: its CANDIDATE, if set)")
+    parser.add_argument('--drift-reference', default=REFERENCE_PATH,
+                        help="training distribution to monitor input drift against, if present (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    shadow = None
+    if args.registry:
+        model, scaler = HotModel(args.registry), None
+        shadow = CandidateShadow(args.registry, args.shadow, served=model)
+    else:
+        if args.shadow:
+            parser.error("--shadow needs --registry")
+        model, scaler = load_artifacts(args.model, args.scaler)
+    try:
+        drift = DriftMonitor.load(args.drift_reference)
+    except FileNotFoundError:
+        drift = None
+    server = make_server(model, scaler, args.host, args.port, args.max_batch_size, args.max_wait_ms,
+                         args.cache_size, shadow, drift)
+    print(f"Serving predictions on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+        if shadow is not None:
+            shadow.close()
+        if isinstance(model, HotModel):
+            model.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Compact per-session state and a bounded store for what sessions can rebuild.
+
+Every questionnaire answer is 0-3, so a session's answers fit in 2 bits
+each: ``PackedAnswers`` keeps all 33 of them in one Python int indexed by
+``feature_order`` (plus a second int marking which were given), behind the
+same mapping interface as the dict it replaces.
+
+Heavier per-session objects that can be recomputed, such as the live
+preview's ``IncrementalScorer``, live in a process-wide ``SessionStore``
+instead of ``st.session_state``. The store evicts sessions idle for longer
+than ``idle_ttl`` and the least recently seen ones beyond ``max_sessions``,
+so its memory stays bounded however many kiosks connect; an evicted session
+just rebuilds its entry on its next rerun. Sessions report their measured
+size on every run, and the totals are exported as metrics gauges.
+
+What stays in ``st.session_state`` is small and fixed per session: the
+packed answers, a few flags and the latest assessment. The radios' own
+``q_*`` values are dropped with ``drop_widget_state`` once a submitted
+assessment has packed them, and Streamlit frees the rest when the browser
+disconnects; the store does not evict it.
+
+Usage:
+    st.session_state.answers = PackedAnswers()
+    entry = store.get(session_id)
+    drop_widget_state(st.session_state)
+    store.report(session_id, state_bytes(st.session_state.to_dict()), exclude=[shared_arrays])
+"""
+
+import collections
+import sys
+import threading
+import time
+from collections.abc import MutableMapping
+
+import numpy as np
+
+import metrics
+from features import feature_order, option_counts
+
+_BITS = 2
+_MASK = (1 << _BITS) - 1
+# Bit offset of each questionnaire feature; age is kept separately
+_SHIFTS = {f: i * _BITS for i, f in enumerate(f for f in feature_order if f != 'age')}
+_ORDER = list(_SHIFTS)
+assert max(option_counts.values()) <= 1 << _BITS
+
+
+class PackedAnswers(MutableMapping):
+    """Questionnaire answers bit-packed 2 bits per feature; a drop-in for the answers dict."""
+
+    __slots__ = ('_values', '_present')
+
+    def __init__(self, answers=()):
+        self._values = 0
+        self._present = 0
+        self.update(answers)
+
+    def __getitem__(self, feature):
+        shift = _SHIFTS[feature]
+        if not self._present >> (shift // _BITS) & 1:
+            raise KeyError(feature)
+        return self._values >> shift & _MASK
+
+    def __setitem__(self, feature, value):
+        shift = _SHIFTS[feature]
+        value = int(value)
+        if not 0 <= value < option_counts[feature]:
+            raise ValueError(f"Answer for '{feature}' must be an integer in 0..{option_counts[feature] - 1}")
+        self._values = self._values & ~(_MASK << shift) | value << shift
+        self._present |= 1 << (shift // _BITS)
+
+    def __delitem__(self, feature):
+        shift = _SHIFTS[feature]
+        if not self._present >> (shift // _BITS) & 1:
+            raise KeyError(feature)
+        self._values &= ~(_MASK << shift)
+        self._present &= ~(1 << (shift // _BITS))
+
+    def __contains__(self, feature):
+        shift = _SHIFTS.get(feature)
+        return shift is not None and bool(self._present >> (shift // _BITS) & 1)
+
+    def __iter__(self):
+        present = self._present
+        return (f for i, f in enumerate(_ORDER) if present >> i & 1)
+
+    def __len__(self):
+        return bin(self._present).count('1')
+
+    def __repr__(self):
+        return f'PackedAnswers({dict(self)!r})'
+
+    def nbytes(self):
+        return sys.getsizeof(self) + sys.getsizeof(self._values) + sys.getsizeof(self._present)
+
+
+def widget_key(feature):
+    """Session-state key of the radio answering ``feature``."""
+    return f'q_{feature}'
+
+
+def drop_widget_state(state):
+    """Remove the questionnaire radios' values from ``state``; returns how many were held.
+
+    Call once the answers are in ``PackedAnswers``: the radios restore
+    themselves from it when they are shown again.
+    """
+    keys = [widget_key(f) for f in _ORDER if widget_key(f) in state]
+    for key in keys:
+        del state[key]
+    return len(keys)
+
+
+def state_bytes(obj, exclude=()):
+    """Approximate memory held by ``obj`` and everything it references.
+
+    Counts NumPy buffers by ``nbytes`` and follows containers and instance
+    dicts. Objects in ``exclude`` (e.g. model arrays shared by every session)
+    are not counted.
+    """
+    return _sizeof(obj, {id(shared) for shared in exclude})
+
+
+def _sizeof(obj, seen):
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        # Views and memory maps don't own their buffer
+        return sys.getsizeof(obj) if obj.base is not None else obj.nbytes + sys.getsizeof(obj)
+    if isinstance(obj, PackedAnswers):
+        return obj.nbytes()
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(k, seen) + _sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += _sizeof(vars(obj), seen)
+    return size
+
+
+class SessionStore:
+    """Thread-safe LRU + idle-TTL map of session id to a per-session dict.
+
+    Entries hold only state a session can rebuild; counters and measured
+    sizes are exported through ``metrics`` gauges.
+    """
+
+    def __init__(self, max_sessions=2000, idle_ttl=1800.0, clock=time.monotonic):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be positive")
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._last_seen = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id):
+        """The entry for ``session_id``, created empty if missing or evicted."""
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = self._entries[session_id] = {}
+            self._entries.move_to_end(session_id)
+            self._last_seen[session_id] = now
+            self._expire(now)
+        return entry
+
+    def _drop(self, session_id):
+        del self._entries[session_id]
+        del self._last_seen[session_id]
+        self._sizes.pop(session_id, None)
+
+    def _expire(self, now):
+        # Entries are in last-seen order, so idle ones are at the front
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if self.idle_ttl is None or now - self._last_seen[oldest] < self.idle_ttl:
+                break
+            self._drop(oldest)
+            self.expirations += 1
+            metrics.count('session_expired')
+        while len(self._entries) > self.max_sessions:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+            metrics.count('session_evicted')
+
+    def report(self, session_id, session_state_bytes, exclude=()):
+        """Record a session's measured size: its own state plus its store entry."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            self._sizes[session_id] = session_state_bytes + state_bytes(entry, exclude)
+            stats = self._stats()
+        metrics.gauge('sessions_active', stats['sessions'])
+        metrics.gauge('session_bytes_total', stats['bytes_total'])
+        metrics.gauge('session_bytes_max', stats['bytes_max'])
+
+    def _stats(self):
+        sizes = list(self._sizes.values())
+        return {
+            'sessions': len(self._entries),
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'bytes_total': sum(sizes),
+            'bytes_mean': sum(sizes) / len(sizes) if sizes else 0.0,
+            'bytes_max': max(sizes, default=0),
+        }
+
+    def stats(self):
+        with self._lock:
+            return self._stats()
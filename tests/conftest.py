@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root, not in an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import feature_order, random_answers  # noqa: E402
+
+
+def synthetic_data(n=600, seed=0):
+    """Random questionnaire vectors labelled by their strongest of six answer groups."""
+    X = random_answers(n, seed)
+    answers = np.delete(X, feature_order.index('age'), axis=1)
+    groups = answers[:, :30].reshape(n, 6, 5).sum(axis=2)
+    return X, np.argmax(groups, axis=1) + 1
+
+
+@pytest.fixture(scope='session')
+def data():
+    return synthetic_data()
+
+
+@pytest.fixture(scope='session')
+def scaler(data):
+    from sklearn.preprocessing import StandardScaler
+
+    return StandardScaler().fit(data[0])
+
+
+@pytest.fixture(scope='session')
+def forest(data, scaler):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = data
+    return RandomForestClassifier(n_estimators=25, max_depth=8, random_state=42,
+                                  class_weight='balanced').fit(scaler.transform(X), y)
+
+
+@pytest.fixture(scope='session')
+def svm(data, scaler):
+    from sklearn.svm import SVC
+
+    X, y = data
+    return SVC(kernel='rbf', random_state=42, class_weight='balanced').fit(scaler.transform(X), y)
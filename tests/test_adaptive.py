@@ -0,0 +1,28 @@
+import numpy as np
+
+from adaptive import AdaptivePlanner
+from features import questions, random_answers
+
+clinical = [q['feature'] for q in questions['clinical']]
+
+
+def test_settles_once_every_clinical_question_is_answered(forest, scaler):
+    planner = AdaptivePlanner(forest, scaler, random_answers(256, seed=1))
+    for row in random_answers(10, seed=2).astype(int):
+        answers = dict(zip(clinical, row[:len(clinical)].tolist()))
+        status = planner.status(answers, 40, clinical)
+        # Lab answers are submitted as 0 on this path, so nothing is left to vary
+        assert status['settled']
+        assert status['agreement'] == 1.0
+        assert status['next_feature'] is None
+
+
+def test_only_candidates_are_ranked(forest, scaler):
+    planner = AdaptivePlanner(forest, scaler, random_answers(256, seed=1))
+    status = planner.status({'erythema': 2}, 40, clinical)
+    assert set(status['gains']) == set(clinical) - {'erythema'}
+    if status['settled']:
+        assert status['next_feature'] is None
+    else:
+        assert status['next_feature'] in status['gains']
+    assert np.isfinite(list(status['gains'].values())).all()
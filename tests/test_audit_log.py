@@ -0,0 +1,66 @@
+import glob
+import os
+import time
+
+import numpy as np
+
+from audit_log import LOG_COLUMNS, SEGMENT_PATTERN, AuditLog, load_log
+from features import feature_order, random_answers
+
+rows = random_answers(5, seed=9)
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_writer_batches_and_close_flushes_the_rest(tmp_path):
+    log = AuditLog(str(tmp_path), batch_size=2, flush_interval=60)
+    for i, row in enumerate(rows):
+        log.record(row, i % 6 + 1, 'v0001', latency=0.01 * i, confidence=0.5)
+    # Full batches are written without waiting for the flush interval
+    _wait_for(lambda: log.stats()['written'] == 4)
+    assert log.stats()['segments'] == 2
+    started = time.monotonic()
+    log.close()
+    assert time.monotonic() - started < 5
+    assert log.stats() == {'recorded': 5, 'dropped': 0, 'written': 5, 'segments': 3, 'errors': 0, 'queued': 0}
+    log.close()
+
+    logged = load_log(str(tmp_path))
+    assert list(logged.columns) == LOG_COLUMNS
+    np.testing.assert_array_equal(logged[feature_order].to_numpy(), rows)
+    assert logged['class'].tolist() == [1, 2, 3, 4, 5]
+    assert (logged['model_version'] == 'v0001').all() and (logged['confidence'] == 0.5).all()
+    np.testing.assert_allclose(logged['latency'], [0, 0.01, 0.02, 0.03, 0.04], rtol=1e-6)
+
+
+def test_segments_from_several_writers_load_in_time_order(tmp_path):
+    first, second = AuditLog(str(tmp_path), batch_size=1), AuditLog(str(tmp_path), batch_size=1)
+    for i, row in enumerate(rows):
+        (first if i % 2 == 0 else second).record(row, i + 1)
+        _wait_for(lambda: first.stats()['written'] + second.stats()['written'] == i + 1)
+    first.close()
+    second.close()
+    segments = sorted(glob.glob(os.path.join(str(tmp_path), SEGMENT_PATTERN)))
+    assert len(segments) == 5
+    # File names need not sort in time order (e.g. clock skew between hosts)
+    os.rename(segments[-1], os.path.join(str(tmp_path), 'assessments-0-0.npz'))
+    logged = load_log(str(tmp_path))
+    assert logged['class'].tolist() == [1, 2, 3, 4, 5]
+    assert logged['timestamp'].is_monotonic_increasing
+
+
+def test_empty_log_has_the_same_columns_and_dtypes(tmp_path):
+    empty = load_log(str(tmp_path / 'missing'))
+    log = AuditLog(str(tmp_path))
+    log.record(rows[0], 3)
+    log.close()
+    logged = load_log(str(tmp_path))
+    assert len(empty) == 0 and len(logged) == 1
+    assert list(empty.columns) == list(logged.columns)
+    assert empty.dtypes.to_dict() == logged.dtypes.to_dict()
+    assert logged['model_version'].tolist() == [''] and np.isnan(logged['confidence'][0])
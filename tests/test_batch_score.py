@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from batch_score import main, score_file, score_frame
+from features import feature_order, random_answers
+from inference import class_names
+
+X = random_answers(50, seed=10)
+
+
+@pytest.fixture
+def records():
+    df = pd.DataFrame(X, columns=feature_order).astype(int)
+    # Extra columns ride along; feature columns may come in any order
+    df.insert(0, 'patient_id', [f'p{i:03d}' for i in range(len(df))])
+    return df[['patient_id'] + feature_order[::-1]]
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_scores_every_chunk_in_input_order(records, forest, scaler, tmp_path, suffix):
+    source, output = str(tmp_path / f'in{suffix}'), str(tmp_path / f'out{suffix}')
+    if suffix == '.csv':
+        records.to_csv(source, index=False)
+    else:
+        records.to_parquet(source, index=False)
+    assert score_file(source, output, forest, scaler, chunk_size=16) == len(records)
+    scored = pd.read_csv(output) if suffix == '.csv' else pd.read_parquet(output)
+    expected = forest.predict(scaler.transform(X))
+    assert list(scored.columns) == list(records.columns) + ['predicted_class', 'predicted_disease']
+    assert scored['patient_id'].tolist() == records['patient_id'].tolist()
+    assert scored['predicted_class'].tolist() == expected.tolist()
+    assert scored['predicted_disease'].tolist() == class_names(expected).tolist()
+
+
+def test_rejects_missing_and_non_numeric_features(records, forest, scaler):
+    with pytest.raises(ValueError, match="Missing feature columns: erythema"):
+        score_frame(records.drop(columns='erythema'), forest, scaler)
+    broken = records.astype({'scaling': object})
+    broken.loc[3, 'scaling'] = 'n/a'
+    with pytest.raises(ValueError, match=r"rows \[3\]"):
+        score_frame(broken, forest, scaler)
+
+
+def test_cli_rejects_a_non_positive_chunk_size(tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'), '--chunk-size', '0'])
@@ -0,0 +1,17 @@
+import pytest
+
+import benchmark
+
+
+def test_artifact_bytes_counts_directory_exports(tmp_path):
+    export = tmp_path / 'skin_disease_model'
+    export.mkdir()
+    (export / 'manifest.json').write_bytes(b'x' * 10)
+    (export / 'feature.npy').write_bytes(b'x' * 100)
+    assert benchmark.artifact_bytes(str(export), 'scaler.pkl') == 110
+
+
+def test_baseline_cannot_be_overwritten_by_the_run(tmp_path):
+    path = str(tmp_path / 'benchmark_results.json')
+    with pytest.raises(SystemExit):
+        benchmark.main(['--baseline', path, '--out', path])
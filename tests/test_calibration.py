@@ -0,0 +1,28 @@
+import json
+
+import numpy as np
+
+from calibration import fit_temperature, load_temperature, log_loss, model_kind, out_of_fold_scores
+from inference import model_fingerprint
+
+
+def test_fitted_temperature_lowers_out_of_fold_log_loss(data, scaler, svm):
+    X, y = data
+    scores = out_of_fold_scores(svm, scaler.transform(X), y, n_folds=3)
+    temperature = fit_temperature(scores, y)
+    assert log_loss(scores, y, temperature) < log_loss(scores, y)
+    for nearby in (temperature * 0.8, temperature * 1.25):
+        assert log_loss(scores, y, temperature) <= log_loss(scores, y, nearby)
+
+
+def test_calibration_for_another_model_is_ignored(forest, svm, scaler, tmp_path):
+    path = str(tmp_path / 'calibration.json')
+    assert load_temperature(path, default=None) is None
+    with open(path, 'w') as f:
+        json.dump({'model_kind': model_kind(forest), 'model_fingerprint': model_fingerprint(forest, scaler),
+                   'temperature': 2.5}, f)
+    assert load_temperature(path, kind='forest', fingerprint=model_fingerprint(forest, scaler)) == 2.5
+    assert load_temperature(path, kind='svc') == 1.0
+    assert load_temperature(path, kind='forest', default=None,
+                            fingerprint=model_fingerprint(svm, scaler)) is None
+    assert np.isclose(load_temperature(path), 2.5)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from clinical_table import ClinicalTable, _decode, build_table, clinical_features, model_fingerprint, n_combinations
+from features import feature_order
+
+
+def test_lookups_match_the_forest(forest, scaler, tmp_path):
+    path = str(tmp_path / 'table.npy')
+    build_table(forest, scaler, path, ages=[25, 60])
+    table = ClinicalTable.load(path, model_fingerprint(forest, scaler))
+    indices = np.random.default_rng(3).integers(0, n_combinations, 200)
+    for digits in _decode(indices):
+        answers = dict(zip(clinical_features, digits.tolist()))
+        for age in (25, 60):
+            row = np.zeros(len(feature_order))
+            row[[feature_order.index(f) for f in clinical_features]] = digits
+            row[feature_order.index('age')] = age
+            assert table.lookup(answers, age) == forest.predict(scaler.transform(row[None, :]))[0]
+    assert table.lookup(answers, 40) is None
+    assert table.lookup(dict(answers, melanin_incontinence=1), 25) is None
+
+
+def test_rejects_a_table_built_for_another_model(forest, svm, scaler, tmp_path):
+    path = str(tmp_path / 'table.npy')
+    build_table(forest, scaler, path, ages=[30])
+    with pytest.raises(ValueError, match="different model"):
+        ClinicalTable.load(path, model_fingerprint(svm, scaler))
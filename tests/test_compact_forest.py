@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from compact_forest import _VALUE_SCALE, CompactForest, compact_arrays, export_compact
+from fastpath import FastPredictor, fused_arrays
+from features import random_answers
+from inference import load_artifacts, predict_proba_matrix
+from whatif import IncrementalScorer
+
+X = random_answers(5000, seed=8)
+
+
+def test_unpruned_export_only_rounds_the_votes(forest, scaler):
+    compact = CompactForest(compact_arrays(forest, scaler, prune=False))
+    expected = forest.predict_proba(scaler.transform(X))
+    np.testing.assert_allclose(compact.predict_proba(X), expected, rtol=0, atol=0.5 / _VALUE_SCALE)
+    assert np.mean(compact.predict(X) == forest.predict(scaler.transform(X))) >= 0.995
+
+
+def test_pruned_export_agrees_with_the_forest(forest, scaler):
+    full = compact_arrays(forest, scaler, prune=False)
+    compact = CompactForest(compact_arrays(forest, scaler))
+    assert compact.arrays['left'].size < full['left'].size
+    assert np.mean(compact.predict(X) == forest.predict(scaler.transform(X))) >= 0.95
+
+
+def test_export_loads_back(forest, scaler, tmp_path):
+    path = str(tmp_path / 'kiosk.npz')
+    export_compact(forest, scaler, path, n_trees=10)
+    in_memory = CompactForest(compact_arrays(forest, scaler, n_trees=10))
+    loaded = FastPredictor.load(path)
+    assert isinstance(loaded, CompactForest) and loaded.arrays['roots'].size == 10
+    assert loaded.arrays['feature'].dtype == np.int8 and loaded.arrays['value'].dtype == np.uint8
+    np.testing.assert_array_equal(loaded.predict_proba(X), in_memory.predict_proba(X))
+    model, scaler_loaded = load_artifacts(path)
+    assert scaler_loaded is None
+    np.testing.assert_array_equal(model.predict(X), in_memory.predict(X))
+    # The live preview scores the same model from its expanded float arrays
+    scorer = IncrementalScorer(fused_arrays(loaded))
+    for row in X[:20]:
+        np.testing.assert_allclose(scorer.score(row), predict_proba_matrix(loaded, None, row)[0], rtol=0, atol=1e-9)
+
+
+def test_only_forests_can_be_compacted(svm, scaler):
+    with pytest.raises(ValueError, match="Only random forests"):
+        compact_arrays(svm, scaler)
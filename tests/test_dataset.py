@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import dataset
+from features import feature_order, option_counts, uci_columns
+
+
+def uci_rows(n=60, seed=0):
+    """Rows in the UCI file layout: 33 answers, then age (some missing), then the class."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        answers = [int(rng.integers(0, option_counts[f])) for f in uci_columns[:-2]]
+        age = '?' if i % 20 == 0 else str(int(rng.integers(10, 76)))
+        rows.append(','.join(map(str, answers)) + f',{age},{i % dataset.N_CLASSES + 1}')
+    return '\n'.join(rows) + '\n'
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'dermatology.data'
+    path.write_text(uci_rows())
+    return str(path)
+
+
+def test_ingest_reads_age_from_the_last_column(source, tmp_path):
+    manifest = dataset.ingest(source, str(tmp_path / 'data'))
+    assert manifest['rows'] == 57
+    assert manifest['dropped_incomplete_rows'] == 3
+
+    X, y = dataset.load_arrays(str(tmp_path / 'data'), source)
+    raw = np.genfromtxt(source, delimiter=',', missing_values='?', filling_values=np.nan)
+    raw = raw[~np.isnan(raw).any(axis=1)]
+    assert np.array_equal(X[:, feature_order.index('age')], raw[:, uci_columns.index('age')])
+    for f in feature_order:
+        assert np.array_equal(X[:, feature_order.index(f)], raw[:, uci_columns.index(f)])
+    assert np.array_equal(y, raw[:, -1])
+
+
+def test_load_frame_matches_cached_arrays(source, tmp_path):
+    direct = dataset.load_frame(source)
+    dataset.ingest(source, str(tmp_path / 'data'))
+    cached = dataset.load_frame(data_dir=str(tmp_path / 'data'))
+    assert list(direct.columns) == list(cached.columns)
+    assert np.array_equal(direct.to_numpy(), cached.to_numpy())
+
+
+def test_stale_cache_is_reingested(source, tmp_path):
+    data_dir = str(tmp_path / 'data')
+    dataset.ingest(source, data_dir)
+    # A cache written before the file's age column was placed correctly
+    (tmp_path / 'data' / dataset.MANIFEST_FILE).write_text('{"columns": []}')
+    dataset.load_arrays(data_dir, source)
+    assert dataset._current(data_dir)
+
+
+def test_validate_rejects_out_of_range_answers(source):
+    df = dataset.load_frame(source)
+    df.loc[df.index[0], 'band_like_infiltrate'] = 40
+    with pytest.raises(ValueError, match="'band_like_infiltrate' outside 0..3"):
+        dataset.validate(df)
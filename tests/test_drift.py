@@ -0,0 +1,43 @@
+import numpy as np
+
+from drift import DriftMonitor, histogram, reference_profile
+from features import feature_order, questions, random_answers
+
+lab = [feature_order.index(q['feature']) for q in questions['histopathological']]
+
+
+def _monitor(**kwargs):
+    X = random_answers(2000, seed=0)
+    return DriftMonitor(reference_profile(X, np.arange(len(X)) % 6 + 1), **kwargs)
+
+
+def test_unanswered_features_are_not_counted():
+    X = random_answers(5, seed=1)
+    answered = np.ones(X.shape, dtype=bool)
+    answered[:, lab] = False
+    counts = histogram(X, answered)
+    assert counts[lab].sum() == 0
+    assert np.delete(counts, lab, axis=0).sum(axis=1).tolist() == [5] * (len(feature_order) - len(lab))
+
+
+def test_skipped_lab_answers_raise_no_alert():
+    monitor = _monitor(check_every=50)
+    X = random_answers(400, seed=2)
+    X[:, lab] = 0
+    answered = np.ones(X.shape, dtype=bool)
+    answered[:, lab] = False
+    monitor.update(X, answered=answered)
+    report = monitor.check()
+    assert report['drifted'] == []
+    assert report['features'][feature_order[lab[0]]]['weight'] == 0
+
+
+def test_alerts_clear_once_traffic_returns_to_normal():
+    monitor = _monitor(half_life=200, check_every=50)
+    shifted = random_answers(400, seed=3)
+    shifted[:, 0] = 0
+    monitor.update(shifted)
+    assert feature_order[0] in monitor.check()['drifted']
+    for seed in range(4, 12):
+        monitor.update(random_answers(200, seed=seed))
+    assert feature_order[0] not in monitor.check()['drifted']
@@ -0,0 +1,61 @@
+import numpy as np
+
+from explain import AGE_GRID, explain_matrix, top_answers
+from features import feature_order, option_counts, random_answers
+from inference import predict_proba_matrix
+
+
+def test_matches_scoring_each_alternative_separately(forest, scaler):
+    rows = random_answers(3, seed=6)
+    result = explain_matrix(forest, scaler, rows, temperature=0.5)
+    base = predict_proba_matrix(forest, scaler, rows, 0.5)
+    np.testing.assert_allclose(result['proba'], base)
+    for i, row in enumerate(rows):
+        target = result['target'][i] - 1
+        assert target == np.argmax(base[i])
+        for f, feature in enumerate(feature_order):
+            values = AGE_GRID if feature == 'age' else range(option_counts[feature])
+            changed = []
+            for value in values:
+                variant = row.copy()
+                variant[f] = value
+                changed.append(predict_proba_matrix(forest, scaler, variant, 0.5)[0])
+            changed = np.array(changed)
+            assert np.isclose(result['sensitivity'][i, f], np.abs(changed[:, target] - base[i, target]).max())
+            assert result['flips'][i, f] == np.any(np.argmax(changed, axis=1) != target)
+            expected = 0.0 if feature == 'age' else base[i, target] - changed[0, target]
+            assert np.isclose(result['contribution'][i, f], expected)
+
+
+def test_explains_a_requested_class():
+    class Fixed:
+        """Probabilities that depend on erythema alone: class 1 for 0, class 2 otherwise."""
+
+        classes_ = np.arange(1, 7)
+
+        def predict_proba(self, X):
+            second = np.where(X[:, 0] > 0, 0.9, 0.1)
+            return np.column_stack([1 - second] + [second] + [np.zeros(len(X))] * 4)
+
+    row = np.zeros(len(feature_order))
+    row[0] = 3
+    result = explain_matrix(Fixed(), None, row[None, :])
+    assert result['target'].tolist() == [2]
+    assert np.isclose(result['contribution'][0, 0], 0.9 - 0.1)
+    assert result['flips'][0, 0] and not result['flips'][0, 1:].any()
+    against = explain_matrix(Fixed(), None, row[None, :], target=1)
+    assert np.isclose(against['contribution'][0, 0], 0.1 - 0.9)
+    assert top_answers(against, 0, {'erythema': 3}) == []
+
+
+def test_top_answers_are_strongest_first_and_supporting_only():
+    contribution = np.zeros((1, len(feature_order)))
+    erythema, scaling, itching = (feature_order.index(f) for f in ('erythema', 'scaling', 'itching'))
+    contribution[0, [erythema, scaling, itching]] = [0.05, 0.3, -0.2]
+    result = {'contribution': contribution, 'flips': np.zeros_like(contribution, dtype=bool)}
+    result['flips'][0, scaling] = True
+    items = top_answers(result, 0, {'erythema': 1, 'scaling': 3}, k=5)
+    assert [item['feature'] for item in items] == ['scaling', 'erythema']
+    assert [item['flips'] for item in items] == [True, False]
+    assert items[0]['contribution'] == 0.3
+    assert [item['feature'] for item in top_answers(result, 0, {}, k=1)] == ['scaling']
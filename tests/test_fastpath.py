@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from fastpath import FastPredictor, export_model, model_arrays
+from features import random_answers
+
+X = random_answers(2000, seed=7)
+
+
+@pytest.mark.parametrize('fuse', [True, False])
+def test_forest_matches_sklearn(forest, scaler, fuse):
+    fast = FastPredictor(model_arrays(forest, scaler, fuse))
+    np.testing.assert_array_equal(fast.predict(X), forest.predict(scaler.transform(X)))
+    np.testing.assert_allclose(fast.predict_proba(X), forest.predict_proba(scaler.transform(X)), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('fuse', [True, False])
+def test_svm_matches_sklearn(svm, scaler, fuse):
+    fast = FastPredictor(model_arrays(svm, scaler, fuse))
+    np.testing.assert_array_equal(fast.predict(X), svm.predict(scaler.transform(X)))
+    np.testing.assert_allclose(fast.decision_function(X), svm.decision_function(scaler.transform(X)),
+                               rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('name', ['model.npz', 'model'])
+def test_exports_load_back(forest, scaler, tmp_path, name):
+    path = str(tmp_path / name)
+    export_model(forest, scaler, path)
+    export_model(forest, scaler, path)  # replacing an existing export
+    np.testing.assert_array_equal(FastPredictor.load(path).predict(X), forest.predict(scaler.transform(X)))
@@ -0,0 +1,47 @@
+import os
+
+import joblib
+
+from fastpath import export_model
+from inference import FAST_MODEL_DIR, FAST_MODEL_PATH, MODEL_PATH, SCALER_PATH, serving_model_path
+
+
+def _touch(path, mtime):
+    files = [os.path.join(path, name) for name in os.listdir(path)] if os.path.isdir(path) else [path]
+    for name in files:
+        os.utime(name, (mtime, mtime))
+
+
+def test_prefers_fresh_exports_and_skips_stale_ones(forest, scaler, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert serving_model_path() is None
+    joblib.dump(forest, MODEL_PATH)
+    joblib.dump(scaler, SCALER_PATH)
+    export_model(forest, scaler, FAST_MODEL_PATH)
+    export_model(forest, scaler, FAST_MODEL_DIR)
+    for path in (MODEL_PATH, SCALER_PATH):
+        _touch(path, 1_000_000)
+    assert serving_model_path() == FAST_MODEL_DIR
+
+    # Retrained after the directory export, before the .npz one
+    _touch(FAST_MODEL_DIR, 500_000)
+    assert serving_model_path() == FAST_MODEL_PATH
+    _touch(FAST_MODEL_PATH, 500_000)
+    assert serving_model_path() == MODEL_PATH
+
+
+def test_lazy_model_records_stage_timings(forest, scaler, monkeypatch):
+    import metrics
+    from features import random_answers
+    from inference import LazyModel, predict_matrix
+
+    stages = []
+    monkeypatch.setattr(metrics, 'observe', lambda stage, started: stages.append(stage))
+    model = LazyModel(lambda: (forest, scaler), warmup_rows=0)
+    model.wait()
+    stages.clear()
+    X = random_answers(5)
+    expected = forest.predict(scaler.transform(X))
+    assert predict_matrix(model, None, X).tolist() == expected.tolist()
+    assert stages == ['scaler_transform', 'model_predict']
+    assert model.predict(X).tolist() == expected.tolist()
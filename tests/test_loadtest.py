@@ -0,0 +1,33 @@
+import os
+
+import joblib
+import numpy as np
+
+import loadtest
+from features import random_answers
+from inference import MODEL_PATH, SCALER_PATH
+
+
+def test_percentiles_are_in_milliseconds():
+    stats = loadtest._percentiles([0.001] * 99 + [0.1])
+    assert np.isclose(stats['p50_ms'], 1.0) and np.isclose(stats['max_ms'], 100.0)
+    assert loadtest._percentiles([]) == {}
+
+
+def test_sessions_complete_against_a_running_app(forest, scaler, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    joblib.dump(forest, MODEL_PATH)
+    joblib.dump(scaler, SCALER_PATH)
+    # Synthetic patients instead of the UCI download
+    monkeypatch.setattr(loadtest, 'sample_patients', lambda n, seed=0: random_answers(n, seed).astype(np.int64))
+    process, url = loadtest.start_server(env=dict(os.environ, SDP_AUDIT_LOG=''))
+    try:
+        report = loadtest.run(url, n_sessions=4, concurrency=2, lab_fraction=0.5, server_pid=process.pid)
+    finally:
+        loadtest.stop_server(process)
+    assert report['failures'] == []
+    assert report['warmup_outcome'] in ('prediction', 'low_symptom')
+    assert sum(report['outcomes'].values()) == 4
+    assert set(report['outcomes']) <= {'prediction', 'low_symptom'}
+    assert report['reruns_per_session'] > 2 and report['rerun_latency']['p50_ms'] > 0
+    assert report['server_rss_kib']['peak'] >= report['server_rss_kib']['before'] > 0
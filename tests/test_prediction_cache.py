@@ -0,0 +1,95 @@
+import numpy as np
+
+from features import feature_order, random_answers
+from prediction_cache import PredictionCache, pack_key, unpack_key
+
+rows = random_answers(8, seed=4)
+
+
+class Counting:
+    """Stand-in model that records which rows it was asked about."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(('predict', len(X)))
+        return (X[:, 0] % 6 + 1).astype(np.int64)
+
+    def proba(self, X):
+        self.calls.append(('proba', len(X)))
+        return np.full((len(X), 6), 1 / 6)
+
+
+def test_probabilities_are_cached_with_the_class():
+    cache, model = PredictionCache(), Counting()
+    classes, proba = cache.predict_proba(rows, model.predict, model.proba)
+    assert classes.tolist() == model.predict(rows).tolist()
+    assert proba.shape == (len(rows), 6)
+    model.calls.clear()
+    again, proba_again = cache.predict_proba(rows[::-1], model.predict, model.proba)
+    assert model.calls == []
+    assert again.tolist() == classes[::-1].tolist()
+    np.testing.assert_array_equal(proba_again, proba[::-1])
+
+
+def test_class_only_entries_are_completed_with_probabilities():
+    cache, model = PredictionCache(), Counting()
+    cache.predict(rows[:4], model.predict)
+    model.calls.clear()
+    cache.predict_proba(rows, model.predict, model.proba)
+    assert model.calls == [('predict', 8), ('proba', 8)]
+    model.calls.clear()
+    cache.predict(rows, model.predict)
+    assert model.calls == []
+
+
+def test_distinct_rows_never_share_a_key():
+    X = random_answers(5000, seed=5)
+    X[:100, feature_order.index('age')] = 127
+    unique_rows = np.unique(X, axis=0)
+    keys = {pack_key(row) for row in unique_rows}
+    assert len(keys) == len(unique_rows)
+    for row in unique_rows[:50]:
+        assert unpack_key(pack_key(row)) == row.astype(int).tolist()
+    # Out-of-range and fractional values fall back to byte keys, never to a packed neighbour
+    older, fractional = X[0].copy(), X[0].copy()
+    older[feature_order.index('age')] = 128
+    fractional[0] = 0.5
+    assert isinstance(pack_key(older), bytes) and isinstance(pack_key(fractional), bytes)
+    assert len({pack_key(X[0]), pack_key(older), pack_key(fractional)}) == 3
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl():
+    clock, model = Clock(), Counting()
+    cache = PredictionCache(ttl=10, clock=clock)
+    cache.predict(rows, model.predict)
+    clock.now = 9.9
+    cache.predict(rows, model.predict)
+    clock.now = 10
+    cache.predict(rows[:3], model.predict)
+    assert model.calls == [('predict', 8), ('predict', 3)]
+    assert cache.stats()['expirations'] == 3
+
+
+def test_least_recently_used_rows_are_evicted_and_counted():
+    cache, model = PredictionCache(maxsize=4), Counting()
+    cache.predict(rows[:4], model.predict)
+    cache.predict(rows[:1], model.predict)
+    cache.predict(rows[4:6], model.predict)
+    model.calls.clear()
+    cache.predict(rows[[0, 3, 4, 5]], model.predict)
+    assert model.calls == []
+    cache.predict(rows[1:3], model.predict)
+    assert model.calls == [('predict', 2)]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (5, 8, 4)
+    assert stats['size'] == 4 and stats['hit_rate'] == 5 / 13
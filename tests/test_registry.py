@@ -0,0 +1,83 @@
+import joblib
+import pytest
+
+from features import random_answers
+from registry import (CandidateShadow, HotModel, ShadowScorer, activate, current_version, load_version, publish,
+                      set_candidate, versions)
+
+
+@pytest.fixture
+def registry(forest, svm, scaler, tmp_path):
+    for name, model in (('forest.pkl', forest), ('svm.pkl', svm)):
+        joblib.dump(model, tmp_path / name)
+    joblib.dump(scaler, tmp_path / 'scaler.pkl')
+    path = str(tmp_path / 'registry')
+    publish(str(tmp_path / 'forest.pkl'), str(tmp_path / 'scaler.pkl'), 0.9, path, activate_now=True)
+    publish(str(tmp_path / 'svm.pkl'), str(tmp_path / 'scaler.pkl'), 0.8, path)
+    return path
+
+
+def test_publish_and_activate(registry, svm, scaler):
+    assert [(m['version'], m['model_kind']) for m in versions(registry)] == [('v0001', 'forest'), ('v0002', 'svc')]
+    assert current_version(registry) == 'v0001'
+    activate('v0002', registry)
+    assert current_version(registry) == 'v0002'
+    model, loaded_scaler, metadata = load_version('v0002', registry)
+    X = random_answers(20)
+    assert model.predict(loaded_scaler.transform(X)).tolist() == svm.predict(scaler.transform(X)).tolist()
+    assert metadata['accuracy'] == 0.8
+    with pytest.raises(ValueError, match="Unknown model version"):
+        activate('v0009', registry)
+
+
+def test_hot_model_swaps_in_the_activated_version(registry, svm, scaler):
+    model = HotModel(registry, poll_interval=60, warmup_rows=8)
+    try:
+        swaps = []
+        model.listeners.append(lambda: swaps.append(model.version))
+        assert not model.check()
+        activate('v0002', registry)
+        assert model.check()
+        assert swaps == ['v0002'] and model.reloads == 1
+        X = random_answers(20)
+        assert model.predict(X).tolist() == svm.predict(scaler.transform(X)).tolist()
+    finally:
+        model.close()
+
+
+def test_shadow_scores_submitted_rows(forest, svm, scaler):
+    X = random_answers(50)
+    shadow = ShadowScorer(svm, scaler, 'v0002')
+    try:
+        shadow.submit(X, forest.predict(scaler.transform(X))).result()
+        shadow.submit(X, svm.predict(scaler.transform(X))).result()
+    finally:
+        shadow.close()
+    agreed = 50 + int((forest.predict(scaler.transform(X)) == svm.predict(scaler.transform(X))).sum())
+    stats = shadow.stats()
+    assert stats['compared'] == 100 and stats['pending'] == 0
+    assert stats['agreement'] == agreed / 100
+    assert sum(stats['disagreements'].values()) == 100 - agreed
+
+
+def test_candidate_shadow_follows_the_registry(registry, forest, svm, scaler):
+    served = HotModel(registry, poll_interval=60, warmup_rows=0)
+    shadow = CandidateShadow(registry, served=served, poll_interval=60)
+    try:
+        assert shadow.scorer is None
+        set_candidate('v0002', registry)
+        scorer = shadow.refresh(served.version)
+        assert scorer.version == 'v0002'
+        X = random_answers(30)
+        scored = shadow.submit(X, forest.predict(scaler.transform(X))).result()
+        assert scored.tolist() == svm.predict(scaler.transform(X)).tolist()
+
+        # Promoting the candidate stops shadowing it and shuts its pool down
+        activate('v0002', registry)
+        assert served.check()
+        assert shadow.scorer is None and shadow.stats() is None
+        assert scorer._pool._shutdown
+        assert shadow.submit(X, scored) is None
+    finally:
+        shadow.close()
+        served.close()
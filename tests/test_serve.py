@@ -0,0 +1,48 @@
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from features import feature_order
+from serve import MicroBatcher, parse_patient
+
+
+def patient(i):
+    row = [0] * len(feature_order)
+    row[feature_order.index('age')] = 20 + i
+    return row
+
+
+def test_parse_patient_accepts_one_feature_vector():
+    X = parse_patient({'features': patient(5)})
+    assert X.shape == (1, len(feature_order))
+    assert X[0, feature_order.index('age')] == 25
+
+
+@pytest.mark.parametrize('features', [
+    [patient(0)] * 3,
+    patient(0)[:-1],
+    [math.nan if f == 'age' else 0 for f in feature_order],
+    [7 if f == 'erythema' else 30 for f in feature_order],
+    [0.5 if f == 'scaling' else 30 for f in feature_order],
+])
+def test_parse_patient_rejects_anything_but_one_valid_vector(features):
+    with pytest.raises(ValueError):
+        parse_patient(json.loads(json.dumps({'features': features})))
+
+
+def test_batcher_answers_each_request_with_its_own_row():
+    # Predicts each row's age, so a shifted answer is easy to spot
+    age = feature_order.index('age')
+    batcher = MicroBatcher(lambda X: X[:, age].astype(int), max_batch_size=16, max_wait_ms=20)
+    try:
+        with pytest.raises(ValueError):
+            batcher.submit(np.array([patient(0)] * 3, dtype=float))
+        with ThreadPoolExecutor(16) as pool:
+            answers = list(pool.map(lambda i: batcher.predict(parse_patient({'features': patient(i)}), 5), range(64)))
+    finally:
+        batcher.close()
+    assert answers == [20 + i for i in range(64)]
+    assert batcher.stats()['mean_batch_size'] > 1
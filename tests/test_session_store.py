@@ -0,0 +1,63 @@
+import pytest
+
+from features import feature_order, option_counts
+from session_store import PackedAnswers, SessionStore, drop_widget_state, widget_key
+
+
+def test_packed_answers_round_trip():
+    answers = {f: (i * 7) % option_counts[f] for i, f in enumerate(feature_order) if f != 'age'}
+    packed = PackedAnswers(answers)
+    assert dict(packed) == answers and len(packed) == len(answers)
+    del packed['erythema']
+    assert 'erythema' not in packed and len(packed) == len(answers) - 1
+    packed['erythema'] = 0
+    assert 'erythema' in packed and packed['erythema'] == 0
+    assert PackedAnswers({'scaling': 3}).get('itching', 0) == 0
+    with pytest.raises(ValueError):
+        packed['scaling'] = 4
+    with pytest.raises(KeyError):
+        PackedAnswers()['scaling']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_seen_and_idle_sessions():
+    clock = Clock()
+    store = SessionStore(max_sessions=2, idle_ttl=60, clock=clock)
+    store.get('a')['scorer'] = 'a'
+    store.get('b')
+    store.get('a')
+    store.get('c')
+    assert store.evictions == 1
+    assert store.get('a') == {'scorer': 'a'}
+    assert store.get('b') == {}
+
+    clock.now = 30
+    store.get('a')
+    clock.now = 70
+    store.get('c')
+    assert store.expirations == 1
+    assert store.get('a') == {'scorer': 'a'}
+    assert store.stats()['sessions'] == 2
+
+
+def test_reported_sizes_are_dropped_with_their_session():
+    store = SessionStore(max_sessions=1, idle_ttl=None)
+    store.get('a')['rows'] = list(range(100))
+    store.report('a', 1000)
+    assert store.stats()['bytes_total'] > 1000
+    store.get('b')
+    store.report('a', 1000)
+    assert store.stats()['bytes_total'] == 0
+
+
+def test_drop_widget_state_keeps_packed_answers():
+    state = {widget_key('erythema'): 2, widget_key('scaling'): 1, 'answers': PackedAnswers({'erythema': 2})}
+    assert drop_widget_state(state) == 2
+    assert list(state) == ['answers'] and state['answers']['erythema'] == 2
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from sklearn.model_selection import cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+import train
+from train import FoldCache, Search, make_estimator, search
+
+jobs = [('Random Forest', {'n_estimators': 10, 'max_depth': 4, 'class_weight': 'balanced'}),
+        ('SVM', {'C': 1, 'gamma': 'scale', 'class_weight': 'balanced'}),
+        ('SVM', {'C': 10, 'gamma': 'scale', 'class_weight': 'balanced'})]
+
+
+@pytest.fixture
+def small(data):
+    X, y = data
+    return X[:240], y[:240]
+
+
+def test_scores_match_scaling_inside_each_fold(small, tmp_path):
+    X, y = small
+    searcher = Search(X, y, n_folds=3, workers=2, cache_dir=str(tmp_path))
+    try:
+        means, _ = searcher.run(jobs)
+    finally:
+        searcher.close()
+    for (name, params), mean in zip(jobs, means):
+        pipeline = make_pipeline(StandardScaler(), make_estimator(name, params))
+        expected = cross_val_score(pipeline, X, y, cv=searcher.n_folds).mean()
+        assert np.isclose(mean, expected)
+
+
+def test_resumed_search_reuses_every_cached_fold(small, tmp_path, monkeypatch):
+    X, y = small
+    monkeypatch.setattr(train, 'candidates', lambda name, strategy, n_iter: [p for n, p in jobs if n == name])
+    first = Search(X, y, n_folds=3, workers=2, cache_dir=str(tmp_path))
+    try:
+        ranked = search(first, ['Random Forest', 'SVM'])
+    finally:
+        first.close()
+    assert first.evaluated == 9 and first.cached == 0
+    assert [len(ranked[name]) for name in ('Random Forest', 'SVM')] == [1, 2]
+    assert ranked['SVM'][0][0] >= ranked['SVM'][1][0]
+
+    resumed = Search(X, y, n_folds=3, workers=1, cache_dir=str(tmp_path))
+    try:
+        assert search(resumed, ['Random Forest', 'SVM']) == ranked
+    finally:
+        resumed.close()
+    assert resumed.evaluated == 0 and resumed.cached == 9
+
+
+def test_cache_key_covers_scaling_and_format(tmp_path, monkeypatch):
+    args = ('SVM', {'C': 1}, 0, 5, None)
+    key = FoldCache(str(tmp_path), 'data').key(*args)
+    assert FoldCache(str(tmp_path), 'other').key(*args) != key
+    assert FoldCache(str(tmp_path), 'data', scaling='global').key(*args) != key
+    monkeypatch.setattr(train, 'CACHE_FORMAT', train.CACHE_FORMAT + 1)
+    assert FoldCache(str(tmp_path), 'data').key(*args) != key
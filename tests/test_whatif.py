@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from fastpath import fused_arrays
+from features import feature_order, option_counts, random_answers
+from inference import predict_proba_matrix
+from whatif import IncrementalScorer
+
+
+@pytest.mark.parametrize('name', ['forest', 'svm'])
+def test_updates_match_a_full_model_call(name, scaler, request):
+    model = request.getfixturevalue(name)
+    scorer = IncrementalScorer(fused_arrays(model, scaler), temperature=1.7)
+    rng = np.random.default_rng(5)
+    row = random_answers(1, seed=5)[0]
+    answered = [f for f in feature_order if f != 'age']
+    for step in range(60):
+        if step % 10 == 9:
+            # Several answers changed between two renders
+            for f in rng.choice(answered, 3, replace=False).tolist():
+                row[feature_order.index(f)] = rng.integers(0, option_counts[f])
+        else:
+            f = answered[rng.integers(0, len(answered))]
+            row[feature_order.index(f)] = rng.integers(0, option_counts[f])
+        expected = predict_proba_matrix(model, scaler, row, 1.7)[0]
+        np.testing.assert_allclose(scorer.score(row), expected, rtol=0, atol=1e-9)
+    assert scorer.stats()['full_evaluations'] == 1
+
+
+def test_unchanged_answers_are_not_rescored(forest, scaler):
+    scorer = IncrementalScorer(fused_arrays(forest, scaler))
+    row = random_answers(1, seed=6)[0]
+    first = scorer.score(row)
+    assert scorer.score(row.copy()) is first
+    assert scorer.stats() == {'full_evaluations': 1, 'updates': 0, 'skipped': 1}
@@ -0,0 +1,393 @@
+"""Scriptable, parallel and resumable version of the notebook's model search.
+
+Runs the Random Forest and SVM hyperparameter searches from ``SDP.ipynb`` at
+the same time on a process pool. Every (model, parameters, fold, budget)
+evaluation is cached as a small JSON file, so an interrupted sweep picks up
+where it stopped. Besides the notebook's exhaustive grids it supports random
+search and successive halving over larger spaces. The winner is chosen on the
+held-out test split exactly like the notebook and written to
+``skin_disease_model.pkl`` / ``scaler.pkl``, with the training distribution
+for ``drift.py`` saved next to the scaler; with ``--registry`` it is also
+published as a new version of the model registry (see ``registry.py``).
+
+Usage:
+    python train.py                            # cached dataset from dataset.py
+    python train.py --data dermatology.data
+    python train.py --strategy random --n-iter 60 --workers 8
+    python train.py --strategy halving --cache-dir .search_cache
+    python train.py --registry model_registry --activate
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+from scipy.stats import loguniform, randint
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.metrics.pairwise import rbf_kernel
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from dataset import load_frame, train_test
+from drift import REFERENCE_PATH, reference_profile, save_reference
+from inference import FAST_MODEL_DIR, FAST_MODEL_PATH, MODEL_PATH, SCALER_PATH
+
+RANDOM_STATE = 42
+CACHE_DIR = '.search_cache'
+# Part of every cached score's key: bump the version whenever evaluation
+# changes, so a resumed sweep never mixes in scores computed the old way
+CACHE_FORMAT = 2
+SCALING = 'per-fold'
+
+# Grids from SDP.ipynb
+rf_param_grid = {
+    'n_estimators': [50, 100, 150],
+    'max_depth': [10, 20, None],
+    'min_samples_split': [2, 5],
+    'class_weight': ['balanced']
+}
+
+svm_param_grid = {
+    'C': [0.1, 1, 10],
+    'gamma': ['scale', 0.001, 0.01],
+    'class_weight': ['balanced']
+}
+
+# Wider spaces for random search and successive halving
+rf_param_space = {
+    'n_estimators': randint(50, 501),
+    'max_depth': [5, 10, 15, 20, 30, None],
+    'min_samples_split': randint(2, 11),
+    'min_samples_leaf': randint(1, 5),
+    'max_features': ['sqrt', 'log2', None],
+    'class_weight': ['balanced', 'balanced_subsample']
+}
+
+svm_param_space = {
+    'C': loguniform(1e-2, 1e3),
+    'gamma': loguniform(1e-4, 1e0),
+    'class_weight': ['balanced']
+}
+
+search_spaces = {
+    'Random Forest': (rf_param_grid, rf_param_space),
+    'SVM': (svm_param_grid, svm_param_space),
+}
+
+
+def make_estimator(name, params):
+    if name == 'Random Forest':
+        return RandomForestClassifier(random_state=RANDOM_STATE, **params)
+    if name == 'SVM':
+        return SVC(kernel='rbf', random_state=RANDOM_STATE, **params)
+    raise ValueError(f"Unknown model: {name}")
+
+
+def candidates(name, strategy, n_iter, seed=RANDOM_STATE):
+    grid, space = search_spaces[name]
+    if strategy == 'grid':
+        return list(ParameterGrid(grid))
+    params = ParameterSampler(space, n_iter=n_iter, random_state=seed)
+    # Convert numpy scalars so parameters hash and serialize consistently
+    return [{k: v.item() if hasattr(v, 'item') else v for k, v in p.items()} for p in params]
+
+
+class FoldCache:
+    """One JSON file per finished fold evaluation, keyed by a content hash.
+
+    Besides the data, candidate, fold and budget, the key covers how the folds
+    were scaled and ``CACHE_FORMAT``, so scores computed another way are
+    never reused.
+    """
+
+    def __init__(self, directory, data_key, scaling=SCALING):
+        self.directory = directory
+        self.data_key = data_key
+        self.scaling = scaling
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, name, params, fold, n_folds, budget):
+        payload = json.dumps([CACHE_FORMAT, self.scaling, self.data_key, name, params, fold, n_folds, budget],
+                             sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.directory, key + '.json')) as f:
+                return json.load(f)['score']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key, record):
+        path = os.path.join(self.directory, key + '.json')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp, path)
+
+
+class FoldData:
+    """Fold assignments and per-fold scaled training matrices, built once per dataset.
+
+    Each fold's copy of ``X`` is standardized with the mean and scale of that
+    fold's training rows only (what a scaler fitted inside the fold would
+    do), so held-out rows never leak into the scaling. The arrays are saved
+    as ``.npy`` files under ``directory`` and every worker memory-maps them
+    read-only, so the pool shares one copy through the page cache instead of
+    each process unpickling its own.
+    """
+
+    def __init__(self, directory, X, y, n_folds):
+        self.directory = directory
+        self.folds = list(StratifiedKFold(n_splits=n_folds).split(X, y))
+        if not os.path.exists(os.path.join(directory, 'scaled.npy')):
+            self._build(X, y)
+
+    def _save(self, name, array):
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, array)
+        os.replace(tmp, path)
+
+    def _build(self, X, y):
+        os.makedirs(self.directory, exist_ok=True)
+        fold_of = np.empty(len(y), dtype=np.int16)
+        scaled = np.empty((len(self.folds),) + X.shape, dtype=np.float64)
+        for k, (train, test) in enumerate(self.folds):
+            fold_of[test] = k
+            scaler = StandardScaler().fit(X[train])
+            scaled[k] = scaler.transform(X)
+        self._save('y.npy', y)
+        self._save('fold_of.npy', fold_of)
+        # Written last: its presence marks a complete set
+        self._save('scaled.npy', scaled)
+
+
+# Per-worker memory-mapped fold data, set once by the pool initializer
+_worker = {}
+
+
+def _init_worker(directory):
+    def load(name):
+        return np.load(os.path.join(directory, name), mmap_mode='r')
+
+    _worker.update(scaled=load('scaled.npy'), y=load('y.npy'), fold_of=load('fold_of.npy'))
+
+
+def _fold(fold, budget):
+    """This fold's scaled matrix and train/test indices (training rows subsampled to ``budget``)."""
+    in_fold = _worker['fold_of'] == fold
+    train, test = np.flatnonzero(~in_fold), np.flatnonzero(in_fold)
+    if budget is not None and budget < len(train):
+        train = np.random.default_rng(fold).permutation(train)[:budget]
+    return _worker['scaled'][fold], train, test
+
+
+def _evaluate(name, params, fold, budget):
+    """Fit one candidate on one fold (optionally on a subsample) and score it."""
+    X, train, test = _fold(fold, budget)
+    y = _worker['y']
+    started = time.perf_counter()
+    model = make_estimator(name, params).fit(X[train], y[train])
+    score = accuracy_score(y[test], model.predict(X[test]))
+    return {'score': score, 'fit_seconds': time.perf_counter() - started}
+
+
+def _evaluate_svm(gamma, param_sets, fold, budget):
+    """Score SVMs that share ``gamma`` on one fold, computing the RBF kernel once for all of them."""
+    X, train, test = _fold(fold, budget)
+    y = _worker['y']
+    x_train, x_test = np.asarray(X[train]), np.asarray(X[test])
+    started = time.perf_counter()
+    if gamma == 'scale':
+        gamma = 1.0 / (x_train.shape[1] * x_train.var())
+    elif gamma == 'auto':
+        gamma = 1.0 / x_train.shape[1]
+    k_train = rbf_kernel(x_train, x_train, gamma=gamma)
+    k_test = rbf_kernel(x_test, x_train, gamma=gamma)
+    kernel_seconds = time.perf_counter() - started
+    records = []
+    for params in param_sets:
+        started = time.perf_counter()
+        others = {k: v for k, v in params.items() if k != 'gamma'}
+        model = SVC(kernel='precomputed', random_state=RANDOM_STATE, **others).fit(k_train, y[train])
+        score = accuracy_score(y[test], model.predict(k_test))
+        records.append({'score': score, 'fit_seconds': time.perf_counter() - started,
+                        'kernel_seconds': kernel_seconds})
+    return records
+
+
+class Search:
+    """Cross-validated evaluation of many candidates across a shared process pool.
+
+    Every candidate is scored on the same folds from one ``FoldData``, and
+    SVM candidates that differ only in ``C`` (or class weights) are sent
+    to a worker together so the fold's kernel matrix is computed once per
+    ``gamma`` rather than once per candidate.
+    """
+
+    def __init__(self, X, y, n_folds=5, workers=None, cache_dir=CACHE_DIR):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        y = np.ascontiguousarray(y)
+        self.y = y
+        self.n_folds = n_folds
+        data_key = hashlib.sha1(X.tobytes() + y.tobytes()).hexdigest()
+        self.cache = FoldCache(cache_dir, data_key)
+        fold_dir = os.path.join(cache_dir, f'folds-v{CACHE_FORMAT}-{data_key[:16]}-{n_folds}')
+        self.folds = FoldData(fold_dir, X, y, n_folds).folds
+        self.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(fold_dir,))
+        self.evaluated = 0
+        self.cached = 0
+
+    def close(self):
+        self.pool.shutdown()
+
+    def run(self, jobs, budget=None):
+        """Cross-validate ``[(name, params), ...]``; returns (means, stds) in job order."""
+        scores = [[None] * self.n_folds for _ in jobs]
+        pending = {}
+        kernel_groups = {}
+        for j, (name, params) in enumerate(jobs):
+            for fold in range(self.n_folds):
+                key = self.cache.key(name, params, fold, self.n_folds, budget)
+                score = self.cache.get(key)
+                if score is not None:
+                    scores[j][fold] = score
+                    self.cached += 1
+                elif name == 'SVM':
+                    kernel_groups.setdefault((params.get('gamma', 'scale'), fold), []).append((j, key))
+                else:
+                    future = self.pool.submit(_evaluate, name, params, fold, budget)
+                    pending[future] = [(j, fold, key)]
+        for (gamma, fold), members in kernel_groups.items():
+            future = self.pool.submit(_evaluate_svm, gamma, [jobs[j][1] for j, _ in members], fold, budget)
+            pending[future] = [(j, fold, key) for j, key in members]
+        for future in as_completed(pending):
+            result = future.result()
+            records = result if isinstance(result, list) else [result]
+            for (j, fold, key), record in zip(pending[future], records):
+                name, params = jobs[j]
+                self.cache.put(key, dict(record, model=name, params=params, fold=fold, budget=budget))
+                scores[j][fold] = record['score']
+                self.evaluated += 1
+        return [float(np.mean(s)) for s in scores], [float(np.std(s)) for s in scores]
+
+
+def search(searcher, names, strategy='grid', n_iter=30, factor=3, min_budget=None):
+    """Search every model in ``names`` together; returns {name: [(mean, std, params), ...]} best first."""
+    pool = [(name, params) for name in names for params in candidates(name, strategy, n_iter)]
+    if strategy != 'halving':
+        means, stds = searcher.run(pool)
+        results = list(zip(pool, means, stds))
+    else:
+        # Successive halving: score everyone on a small training budget and keep
+        # the best 1/factor of each model's candidates for the next, larger one.
+        n_train = min(len(train) for train, _ in searcher.folds)
+        budget = min_budget or max(len(np.unique(searcher.y)) * 5, n_train // factor ** 3)
+        while True:
+            full = budget >= n_train
+            means, stds = searcher.run(pool, None if full else budget)
+            results = list(zip(pool, means, stds))
+            if full:
+                break
+            survivors = []
+            for name in names:
+                ranked = sorted((r for r in results if r[0][0] == name), key=lambda r: -r[1])
+                survivors += [job for job, _, _ in ranked[:max(1, len(ranked) // factor)]]
+            pool = survivors
+            budget *= factor
+    ranked = {}
+    for (name, params), mean, std in sorted(results, key=lambda r: -r[1]):
+        ranked.setdefault(name, []).append((mean, std, params))
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel, resumable hyperparameter search for the skin disease model.")
+    parser.add_argument('--data', help="dermatology.data path or URL (default: cached copy in data/)")
+    parser.add_argument('--strategy', choices=['grid', 'random', 'halving'], default='grid',
+                        help="grid reproduces the notebook; random/halving sample wider spaces")
+    parser.add_argument('--n-iter', type=int, default=30, help="candidates per model for random/halving")
+    parser.add_argument('--factor', type=int, default=3, help="successive halving reduction factor")
+    parser.add_argument('--folds', type=int, default=5, help="cross-validation folds (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="per-fold result cache (default: %(default)s)")
+    parser.add_argument('--model-out', default=MODEL_PATH)
+    parser.add_argument('--scaler-out', default=SCALER_PATH)
+    parser.add_argument('--results', help="where to write all candidate scores (default: search_results.json in the cache dir)")
+    parser.add_argument('--registry', help="also publish the winner as a new version in this model registry")
+    parser.add_argument('--activate', action='store_true',
+                        help="serve the published version right away instead of leaving it for 'registry.py activate'")
+    args = parser.parse_args(argv)
+
+    x_train, x_test, y_train, y_test = train_test(load_frame(args.data))
+    scaler = StandardScaler()
+    x_train_scaled = scaler.fit_transform(x_train.values)
+    x_test_scaled = scaler.transform(x_test.values)
+    y_train, y_test = y_train.to_numpy(), y_test.to_numpy()
+
+    started = time.perf_counter()
+    # Raw features: each fold is scaled on its own training rows
+    searcher = Search(x_train.values, y_train, args.folds, args.workers, args.cache_dir)
+    try:
+        ranked = search(searcher, list(search_spaces), args.strategy, args.n_iter, args.factor)
+    finally:
+        searcher.close()
+    print(f"Search finished in {time.perf_counter() - started:.1f}s "
+          f"({searcher.evaluated} fold fits, {searcher.cached} from cache)")
+
+    tuned = {}
+    for name, results in ranked.items():
+        mean, std, params = results[0]
+        model = make_estimator(name, params).fit(x_train_scaled, y_train)
+        tuned[name] = (accuracy_score(y_test, model.predict(x_test_scaled)), model)
+        print(f"\n{name}: CV {mean:.4f} ± {std:.4f}, test {tuned[name][0]:.4f}")
+        for param, value in params.items():
+            print(f"  {param}: {value}")
+
+    # Same tie-break as the notebook: RF only wins with a strictly higher test score
+    final_name = 'Random Forest' if tuned['Random Forest'][0] > tuned['SVM'][0] else 'SVM'
+    final_score, final_model = tuned[final_name]
+    print(f"\nFINAL BEST MODEL: {final_name} (test accuracy {final_score:.4f})")
+    joblib.dump(final_model, args.model_out)
+    joblib.dump(scaler, args.scaler_out)
+    if args.model_out == MODEL_PATH:
+        # The app serves a fast-path export in preference to the pickles; refresh
+        # any that exist so they do not keep serving the previous model
+        from fastpath import FastPredictor, export_model
+
+        for path in (FAST_MODEL_DIR, FAST_MODEL_PATH):
+            if os.path.exists(path):
+                export_model(final_model, scaler, path, fuse=FastPredictor.load(path).fused)
+                print(f"Re-exported {path}")
+    reference_path = os.path.join(os.path.dirname(args.scaler_out), REFERENCE_PATH)
+    save_reference(reference_profile(x_train.values, y_train), reference_path)
+    if args.registry:
+        from registry import publish
+
+        version = publish(args.model_out, args.scaler_out, final_score, args.registry, [reference_path],
+                          activate_now=args.activate,
+                          model_name=final_name, params=ranked[final_name][0][2], strategy=args.strategy)
+        print(f"Published {version} to {args.registry}{' (active)' if args.activate else ''}")
+
+    results_path = args.results or os.path.join(args.cache_dir, 'search_results.json')
+    with open(results_path, 'w') as f:
+        json.dump({
+            'strategy': args.strategy,
+            'final_model': final_name,
+            'test_accuracy': {name: score for name, (score, _) in tuned.items()},
+            'candidates': {name: [{'mean': m, 'std': s, 'params': p} for m, s, p in results]
+                           for name, results in ranked.items()},
+        }, f, indent=2, default=str)
+    print(f"Candidate scores written to {results_path}")
+
+
+if __name__ == '__main__':
+    main()